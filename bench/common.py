@@ -0,0 +1,82 @@
+"""
+Spoločné pomôcky benchmarkov: cesta k aplikácii, percentily a ukladanie výsledkov
+"""
+from datetime import datetime, timezone
+from typing import List
+import json
+import math
+import os
+import subprocess
+import sys
+
+# Moduly aplikácie sú ploché v priečinku fastapi/ (import crud, ingestion, ...)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fastapi")
+
+def use_app_modules():
+    """
+    Sprístupní moduly aplikácie (config číta ../.env relatívne k fastapi/)
+    """
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+
+def coin_id(index: int) -> str:
+    """
+    ID syntetickej kryptomeny, rovnaké v seed.py aj vo fake CoinGecko serveri
+    """
+    return f"bench-coin-{index:06d}"
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    Percentil (lineárna interpolácia) z už zoradených hodnôt
+    """
+    if not sorted_values:
+        return math.nan
+    rank = (len(sorted_values) - 1) * p / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+def summarize(name: str, latencies: List[float], elapsed: float, errors: int = 0) -> dict:
+    """
+    Súhrn jedného scenára: priepustnosť a percentily latencie v milisekundách
+    """
+    values = sorted(latencies)
+    return {
+        "name": name,
+        "requests": len(values),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p90_ms": round(percentile(values, 90) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else math.nan
+    }
+
+def print_results(results: List[dict]):
+    columns = ("name", "requests", "errors", "throughput_rps", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+    widths = [max(len(column), *(len(str(result[column])) for result in results)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        print("  ".join(str(result[column]).ljust(width) for column, width in zip(columns, widths)))
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def append_results(path: str, suite: str, results: List[dict], params: dict):
+    """
+    Pripíše výsledky ako jeden riadok JSON (história behov pre porovnanie v čase)
+    """
+    record = {
+        "suite": suite,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "params": params,
+        "results": results
+    }
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
@@ -0,0 +1,146 @@
+"""
+Lokálna náhrada CoinGecko API pre benchmarky
+
+Obsluhuje /simple/price, /coins/{id} a /exchange_rates pre ľubovoľné ID
+s deterministickými dátami (ceny sa pomaly menia v čase), s nastaviteľnou
+latenciou, chybovosťou a podielom odpovedí 429.
+
+Spustenie:
+    python fake_coingecko.py --port 8001 --latency-ms 50 --jitter-ms 20 --error-rate 0.01
+
+Aplikácia potom beží s COINGECKO_API_URL=http://localhost:8001.
+"""
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+import time
+
+app = FastAPI(title="Fake CoinGecko")
+
+# Nastavenia (menia sa cez argumenty príkazového riadka)
+config = {
+    "latency_ms": 0.0,
+    "jitter_ms": 0.0,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "retry_after": 5,
+    "tick_seconds": 30
+}
+
+stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+def _seed(coin_id: str) -> int:
+    return int.from_bytes(hashlib.sha256(coin_id.encode()).digest()[:8], "big")
+
+def _price(coin_id: str, now: float) -> dict:
+    """
+    Deterministická cena: základ z hashu ID, zmena každých tick_seconds
+    """
+    seed = _seed(coin_id)
+    base = 10 ** ((seed % 1000) / 1000 * 8 - 3)  # 0.001 až 100000 USD
+    tick = int(now // config["tick_seconds"])
+    wave = math.sin(tick / 10 + seed % 100) * 0.05
+    usd = round(base * (1 + wave), 4)
+    supply = 1e6 + seed % 1_000_000_000
+    return {
+        "usd": usd,
+        "usd_market_cap": round(usd * supply, 2),
+        "usd_24h_vol": round(usd * supply * 0.03, 2),
+        "usd_24h_change": round(wave * 100, 2),
+        "last_updated_at": tick * config["tick_seconds"]
+    }
+
+async def _simulate():
+    """
+    Umelá latencia, chyby a odpovede 429 podľa nastavení
+    """
+    stats["requests"] += 1
+    delay = config["latency_ms"] + random.uniform(-config["jitter_ms"], config["jitter_ms"])
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if random.random() < config["rate_limit_rate"]:
+        stats["rate_limited"] += 1
+        raise HTTPException(status_code=429, detail="rate limited", headers={"Retry-After": str(config["retry_after"])})
+    if random.random() < config["error_rate"]:
+        stats["errors"] += 1
+        raise HTTPException(status_code=500, detail="simulated error")
+
+@app.get("/simple/price")
+async def simple_price(ids: str, vs_currencies: str = "usd"):
+    await _simulate()
+    now = time.time()
+    return {coin_id: _price(coin_id, now) for coin_id in ids.split(",") if coin_id}
+
+@app.get("/coins/{coin_id}")
+async def coin(coin_id: str):
+    await _simulate()
+    return {
+        "id": coin_id,
+        "symbol": coin_id.replace("bench-coin-", "b")[:10],
+        "name": coin_id.replace("-", " ").title(),
+        "asset_platform_id": None,
+        "contract_address": None,
+        "genesis_date": None,
+        "categories": ["Benchmark"],
+        "platforms": {},
+        "description": {"en": f"Syntetická kryptomena {coin_id} pre benchmarky. " * 20},
+        "links": {
+            "homepage": [f"https://example.com/{coin_id}"],
+            "blockchain_site": [],
+            "official_forum_url": [],
+            "chat_url": [],
+            "announcement_url": [],
+            "twitter_screen_name": None,
+            "facebook_username": None,
+            "bitcointalk_thread_identifier": None,
+            "telegram_channel_identifier": None,
+            "subreddit_url": None,
+            "repos_url": {"github": []}
+        }
+    }
+
+@app.get("/exchange_rates")
+async def exchange_rates():
+    await _simulate()
+    btc_usd = 60000.0
+    rates = {"btc": 1.0, "usd": btc_usd, "eur": btc_usd * 0.92, "gbp": btc_usd * 0.79, "jpy": btc_usd * 150.0}
+    return {
+        "rates": {
+            currency: {"name": currency.upper(), "unit": currency.upper(), "value": value, "type": "crypto" if currency == "btc" else "fiat"}
+            for currency, value in rates.items()
+        }
+    }
+
+@app.get("/_stats")
+async def get_stats():
+    return JSONResponse(stats)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake CoinGecko server pre benchmarky")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Priemerná latencia odpovede")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Náhodný rozptyl latencie (+/-)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Podiel odpovedí 500 (0-1)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Podiel odpovedí 429 (0-1)")
+    parser.add_argument("--retry-after", type=int, default=5, help="Hodnota Retry-After pri 429")
+    parser.add_argument("--tick-seconds", type=int, default=30, help="Ako často sa menia ceny")
+    args = parser.parse_args()
+    config.update({
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "retry_after": args.retry_after,
+        "tick_seconds": max(args.tick_seconds, 1)
+    })
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Záťažové scenáre pre API (latencia p50/p90/p99 a priepustnosť)
+
+Predpokladá bežiace API nad databázou naplnenou cez seed.py. Každý
+scenár beží --duration sekúnd s --concurrency súbežnými klientmi.
+
+Spustenie:
+    python load.py --base-url http://localhost:8000 --coins 10000 --duration 30 --concurrency 32
+    python load.py --scenario coin_detail --scenario prices --output results.jsonl
+"""
+from common import coin_id, summarize, print_results, append_results
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+def _random_ids(coins: int, count: int) -> str:
+    return ",".join(coin_id(random.randrange(coins)) for _ in range(count))
+
+class CoinsPager:
+    """
+    Prechádza zoznam /coins po stránkach cez next_cursor (ako analytik)
+    """
+
+    def __init__(self, sort: str, include_prices: bool):
+        self.sort = sort
+        self.include_prices = include_prices
+        self.cursor = None
+
+    def request(self):
+        params = {"limit": 100, "sort": self.sort, "include_prices": str(self.include_prices).lower()}
+        if self.cursor:
+            params["cursor"] = self.cursor
+        return "/coins", params
+
+    def response(self, body: dict):
+        self.cursor = body.get("next_cursor")
+
+# Scenár -> funkcia vracajúca (cesta, query parametre) pre ďalšiu požiadavku
+SCENARIOS = {
+    "coins_page": lambda coins: ("/coins", {"limit": 100}),
+    "coins_page_prices": lambda coins: ("/coins", {"limit": 100, "sort": "market_cap", "include_prices": "true"}),
+    "coin_detail": lambda coins: (f"/coins/{coin_id(random.randrange(coins))}", {}),
+    "coin_detail_metadata": lambda coins: (f"/coins/{coin_id(random.randrange(coins))}", {"include_metadata": "true"}),
+    "prices": lambda coins: ("/prices", {"coin_ids": _random_ids(coins, 20)}),
+    "prices_fx": lambda coins: ("/prices", {"coin_ids": _random_ids(coins, 20), "vs": "eur,gbp"}),
+    "market_top": lambda coins: ("/market/top", {"limit": 100, "by": random.choice(("market_cap", "volume", "change"))})
+}
+
+# Scenáre so stavom (každý klient má vlastný kurzor)
+PAGED_SCENARIOS = {
+    "coins_walk": lambda: CoinsPager("coin_id", False),
+    "coins_walk_prices": lambda: CoinsPager("market_cap", True)
+}
+
+async def run_scenario(client: httpx.AsyncClient, name: str, coins: int, duration: float, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        pager = PAGED_SCENARIOS[name]() if name in PAGED_SCENARIOS else None
+        while time.perf_counter() < deadline:
+            path, params = pager.request() if pager else SCENARIOS[name](coins)
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                elapsed = time.perf_counter() - start
+                if response.status_code >= 400:
+                    errors += 1
+                    continue
+                latencies.append(elapsed)
+                if pager:
+                    pager.response(response.json())
+            except httpx.HTTPError:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, time.perf_counter() - started, errors)
+
+async def main_async(args):
+    scenarios = args.scenario or [*SCENARIOS, *PAGED_SCENARIOS]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        results = []
+        for name in scenarios:
+            if args.warmup > 0:
+                await run_scenario(client, name, args.coins, args.warmup, args.concurrency)
+            results.append(await run_scenario(client, name, args.coins, args.duration, args.concurrency))
+            print_results(results[-1:])
+    print()
+    print_results(results)
+    if args.output:
+        append_results(args.output, "load", results, {
+            "base_url": args.base_url,
+            "coins": args.coins,
+            "duration": args.duration,
+            "concurrency": args.concurrency
+        })
+
+def main():
+    parser = argparse.ArgumentParser(description="Záťažové scenáre pre Crypto API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--coins", type=int, default=10000, help="Počet kryptomien z seed.py")
+    parser.add_argument("--scenario", action="append", choices=[*SCENARIOS, *PAGED_SCENARIOS], help="Scenár (opakovateľné, default: všetky)")
+    parser.add_argument("--duration", type=float, default=30, help="Trvanie scenára v sekundách")
+    parser.add_argument("--warmup", type=float, default=5, help="Zahrievanie pred meraním v sekundách (cache, pool)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Počet súbežných klientov")
+    parser.add_argument("--output", help="Súbor JSONL, ku ktorému sa pripíšu výsledky")
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Mikrobenchmarky crud.get_coins a ingestion.update_coin_prices
+
+Bežia priamo nad databázou a Redis z .env (naplnenými cez seed.py), bez
+HTTP vrstvy. update_coin_prices sťahuje ceny z COINGECKO_API_URL, ktorá
+má smerovať na fake_coingecko.py. Rozpočet požiadaviek je počas merania
+vypnutý, meria sa spracovanie a zápis, nie čakanie na limit.
+
+Spustenie:
+    COINGECKO_API_URL=http://localhost:8001 python micro.py --coins 10000 --iterations 50
+    python micro.py --benchmark get_coins_db --output results.jsonl
+"""
+from common import use_app_modules, coin_id, summarize, print_results, append_results
+import argparse
+import asyncio
+import random
+import time
+
+use_app_modules()
+
+import crud
+import coingecko
+import ingestion
+from ratelimit import SharedTokenBucket
+from database import AsyncSessionLocal, async_engine
+from redis_client import async_redis_client, close_clients
+
+async def _measure(name: str, iterations: int, run) -> dict:
+    """
+    Spustí await run() iterations-krát (každý beh s novou session) a vráti súhrn
+    """
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            try:
+                await run(db)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors += 1
+                print(f"{name}: {e}")
+    return summarize(name, latencies, time.perf_counter() - started, errors)
+
+def _pages(sort: str, include_prices: bool):
+    """
+    Stránka z náhodnej pozície (keyset kurzor), aby sa nemeral iba začiatok tabuľky
+    """
+    def run(coins: int):
+        async def load(db):
+            market_cap = f"{random.uniform(1e6, 1e12):.2f}" if sort == "market_cap" else None
+            position = crud.decode_cursor(crud.encode_cursor(sort, coin_id(random.randrange(coins)), market_cap), sort)
+            await crud._load_coins_page(db, position, 100, sort, False, include_prices)
+        return load
+    return run
+
+def _cached_pages(coins: int):
+    async def load(db):
+        await crud.get_coins(db, limit=100, include_prices=True)
+    return load
+
+def _update_prices(batch: int, force: bool):
+    def run(coins: int):
+        async def load(db):
+            start = random.randrange(max(coins - batch, 1))
+            await ingestion.update_coin_prices(db, [coin_id(i) for i in range(start, start + batch)], force=force)
+        return load
+    return run
+
+BENCHMARKS = {
+    "get_coins_db": _pages("coin_id", False),
+    "get_coins_db_prices": _pages("coin_id", True),
+    "get_coins_db_market_cap": _pages("market_cap", True),
+    "get_coins_cached": _cached_pages,
+    "update_prices_250": _update_prices(250, False),
+    "update_prices_250_force": _update_prices(250, True),
+    "update_prices_1000_force": _update_prices(1000, True)
+}
+
+async def main_async(args):
+    # Meriame spracovanie a zápis, nie čakanie na rozpočet požiadaviek
+    coingecko.rate_limiter = SharedTokenBucket(async_redis_client, "bench:ratelimit", 1e9, 1e9)
+
+    results = []
+    for name in args.benchmark or BENCHMARKS:
+        run = BENCHMARKS[name](args.coins)
+        await _measure(name, args.warmup, run)
+        results.append(await _measure(name, args.iterations, run))
+        print_results(results[-1:])
+    print()
+    print_results(results)
+    if args.output:
+        append_results(args.output, "micro", results, {"coins": args.coins, "iterations": args.iterations})
+
+    await coingecko.close_client()
+    await async_engine.dispose()
+    await close_clients()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mikrobenchmarky crud a ingestion")
+    parser.add_argument("--coins", type=int, default=10000, help="Počet kryptomien z seed.py")
+    parser.add_argument("--benchmark", action="append", choices=list(BENCHMARKS), help="Benchmark (opakovateľné, default: všetky)")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--output", help="Súbor JSONL, ku ktorému sa pripíšu výsledky")
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Naplní databázu syntetickými kryptomenami pre benchmarky (10k až 100k)
+
+Ceny sú rovnaké ako z fake_coingecko.py, zápis ide cez funkcie ingestion,
+takže sa naplnia aj história, OHLCV rollupy, rebríčky a snapshot v Redis.
+
+Spustenie (z priečinka bench/, s rovnakým .env ako aplikácia):
+    python seed.py --coins 10000 --ticks 60 --metadata
+    python seed.py --coins 100000 --reset
+"""
+from common import use_app_modules, coin_id
+from fake_coingecko import _price, coin as fake_coin
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import argparse
+import asyncio
+import time
+
+use_app_modules()
+
+import schemas
+import ingestion
+from database import engine, AsyncSessionLocal
+from redis_client import invalidate_cache, close_clients
+
+CHUNK = 5000
+
+async def seed(coins: int, ticks: int, tick_interval: int, metadata: bool, reset: bool):
+    coin_ids = [coin_id(i) for i in range(coins)]
+    started = time.perf_counter()
+
+    async with AsyncSessionLocal() as db:
+        if reset:
+            await db.execute(delete(schemas.Coin).where(schemas.Coin.coin_id.like("bench-coin-%")))
+            for table in (schemas.CoinPriceTick, schemas.CoinPriceOHLC):
+                await db.execute(delete(table).where(table.coin_id.like("bench-coin-%")))
+            await db.commit()
+            ingestion._tick_partitions.clear()
+
+        # Kryptomeny a metadáta
+        for i in range(0, coins, CHUNK):
+            chunk = coin_ids[i:i + CHUNK]
+            await db.execute(pg_insert(schemas.Coin).values([
+                {"coin_id": cid, "symbol": cid.replace("bench-coin-", "b"), "name": cid.replace("-", " ").title()}
+                for cid in chunk
+            ]).on_conflict_do_nothing())
+            if metadata:
+                await ingestion.upsert_coin_metadata(db, {
+                    cid: ingestion.extract_metadata(await fake_coin(cid)) for cid in chunk
+                })
+            await db.commit()
+        print(f"Kryptomeny: {coins} ({time.perf_counter() - started:.1f} s)")
+
+        # História: ticks kôl po tick_interval sekúndach končiacich teraz
+        now = time.time()
+        for round_index in range(ticks):
+            ts = now - (ticks - round_index) * tick_interval
+            for i in range(0, coins, CHUNK):
+                rows = ingestion._price_rows({cid: _price(cid, ts) for cid in coin_ids[i:i + CHUNK]})
+                await ingestion.insert_price_ticks(db, rows)
+                await ingestion.update_ohlc(db, rows)
+                await db.commit()
+        if ticks:
+            print(f"História: {ticks} tickov na kryptomenu ({time.perf_counter() - started:.1f} s)")
+
+        # Aktuálne ceny, snapshot a rebríčky
+        for i in range(0, coins, CHUNK):
+            prices_data = {cid: _price(cid, now) for cid in coin_ids[i:i + CHUNK]}
+            rows = ingestion._price_rows(prices_data)
+            await ingestion.upsert_coin_prices(db, rows)
+            await db.commit()
+            await ingestion.save_price_snapshot(rows)
+            await ingestion.update_rankings(prices_data)
+        print(f"Ceny: {coins} ({time.perf_counter() - started:.1f} s)")
+
+    await invalidate_cache("coin", "coins", "coins_prices", "count", "price", "prices", "top", "analytics")
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("ANALYZE"))
+        await db.commit()
+    await close_clients()
+    print(f"Hotovo za {time.perf_counter() - started:.1f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Naplnenie databázy pre benchmarky")
+    parser.add_argument("--coins", type=int, default=10000, help="Počet kryptomien")
+    parser.add_argument("--ticks", type=int, default=0, help="Počet historických tickov na kryptomenu")
+    parser.add_argument("--tick-interval", type=int, default=60, help="Rozostup tickov v sekundách")
+    parser.add_argument("--metadata", action="store_true", help="Vytvoriť aj metadáta")
+    parser.add_argument("--reset", action="store_true", help="Najprv zmazať existujúce bench-coin-* dáta")
+    args = parser.parse_args()
+
+    schemas.Base.metadata.create_all(bind=engine)
+    ingestion.migrate_legacy_metadata(engine)
+    ingestion.ensure_indexes(engine)
+    asyncio.run(seed(args.coins, args.ticks, args.tick_interval, args.metadata, args.reset))
+
+if __name__ == "__main__":
+    main()
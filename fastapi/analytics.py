@@ -0,0 +1,174 @@
+from sqlalchemy import Float, cast, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import schemas
+import crud
+from redis_client import cached_json
+from typing import List
+from datetime import datetime, timezone, timedelta
+import numpy as np
+import asyncio
+import hashlib
+import logging
+import math
+import warnings
+
+logger = logging.getLogger(__name__)
+
+# Počet sekúnd v roku pre anualizáciu volatility (kryptomeny sa obchodujú nepretržite)
+SECONDS_PER_YEAR = 365 * 86400
+
+# Maximálna veľkosť matice cien (počet období × počet kryptomien)
+MAX_MATRIX_CELLS = 2_000_000
+
+async def load_close_matrix(db: AsyncSession, coin_ids: List[str], resolution: str, start: datetime, end: datetime):
+    """
+    Načíta close ceny z OHLCV rollupu jedným dopytom do matice (obdobia × kryptomeny)
+
+    Chýbajúce obdobia sa doplnia poslednou známou cenou, obdobia pred
+    prvou cenou kryptomeny ostanú NaN.
+    """
+    step = schemas.OHLC_RESOLUTIONS[resolution]
+    first_bucket = int(start.timestamp()) // step * step
+
+    ohlc = schemas.CoinPriceOHLC
+    rows = (await db.execute(
+        select(ohlc.coin_id, ohlc.bucket, cast(ohlc.close, Float))
+        .where(
+            ohlc.coin_id.in_(coin_ids),
+            ohlc.resolution == resolution,
+            ohlc.bucket >= datetime.fromtimestamp(first_bucket, tz=timezone.utc),
+            ohlc.bucket < end
+        )
+    )).all()
+
+    # Plnenie matice je CPU práca, nesmie blokovať event loop
+    periods = math.ceil((end.timestamp() - first_bucket) / step)
+    return await asyncio.to_thread(_close_matrix, rows, coin_ids, step, first_bucket, periods)
+
+def _close_matrix(rows: list, coin_ids: List[str], step: int, first_bucket: int, periods: int) -> np.ndarray:
+    matrix = np.full((periods, len(coin_ids)), np.nan)
+    if rows:
+        columns = {coin_id: i for i, coin_id in enumerate(coin_ids)}
+        cols = np.fromiter((columns[row[0]] for row in rows), dtype=np.intp, count=len(rows))
+        times = np.fromiter((row[1].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+        closes = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+        steps = ((times - first_bucket) // step).astype(np.intp)
+        valid = (steps >= 0) & (steps < periods)
+        matrix[steps[valid], cols[valid]] = closes[valid]
+
+    return _forward_fill(matrix)
+
+def _forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """
+    Doplní NaN poslednou platnou hodnotou v stĺpci (vektorizovane)
+    """
+    if matrix.size == 0:
+        return matrix
+    rows = np.where(~np.isnan(matrix), np.arange(matrix.shape[0])[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return matrix[rows, np.arange(matrix.shape[1])]
+
+def _to_list(values: np.ndarray) -> list:
+    """
+    Prevedie pole na zoznam pre JSON, NaN a nekonečno nahradí None
+    """
+    return np.where(np.isfinite(values), values, None).tolist()
+
+def compute_metrics(prices: np.ndarray, step: int, rolling: int, include_correlation: bool = True) -> dict:
+    """
+    Vypočíta výnosy, volatilitu, drawdown a koreláciu pre všetky stĺpce naraz
+    """
+    annualization = math.sqrt(SECONDS_PER_YEAR / step)
+    with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+        returns = np.diff(np.log(prices), axis=0)
+        observations = np.sum(~np.isnan(returns), axis=0)
+
+        has_price = ~np.isnan(prices)
+        first_price = prices[np.argmax(has_price, axis=0), np.arange(prices.shape[1])]
+        last_price = prices[-1] if len(prices) else np.full(prices.shape[1], np.nan)
+
+        running_max = np.fmax.accumulate(prices, axis=0)
+        max_drawdown = np.nanmin(prices / running_max - 1, axis=0)
+
+        recent = returns[-rolling:]
+        metrics = {
+            "observations": observations,
+            "total_return": last_price / first_price - 1,
+            "volatility": np.nanstd(returns, axis=0, ddof=1) * annualization,
+            "max_drawdown": max_drawdown,
+            "rolling_return": np.expm1(np.nansum(recent, axis=0)),
+            "rolling_volatility": np.nanstd(recent, axis=0, ddof=1) * annualization
+        }
+        metrics["rolling_return"][np.sum(~np.isnan(recent), axis=0) == 0] = np.nan
+
+        correlation = None
+        if include_correlation:
+            # Párová korelácia cez vycentrované výnosy, chýbajúce obdobia prispievajú nulou
+            centered = np.nan_to_num(returns - np.nanmean(returns, axis=0))
+            covariance = centered.T @ centered
+            scale = np.sqrt(np.diag(covariance))
+            correlation = covariance / np.outer(scale, scale)
+            correlation[:, observations < 2] = np.nan
+            correlation[observations < 2, :] = np.nan
+
+    return {"metrics": metrics, "correlation": correlation}
+
+async def get_analytics_json(
+    db: AsyncSession,
+    coin_ids: List[str],
+    window: str = "30d",
+    resolution: str = "1h",
+    rolling: int = 24,
+    include_correlation: bool = True
+):
+    """
+    Výnosy, volatilita, max. drawdown a korelačná matica pre zoznam kryptomien
+
+    Ceny sa načítajú jedným dopytom z OHLCV rollupov a všetky metriky sa
+    počítajú vektorizovane v NumPy. Výsledok sa cachuje (rodina "analytics")
+    ako vyrenderované JSON bajty.
+    """
+    try:
+        if resolution not in schemas.OHLC_RESOLUTIONS:
+            raise ValueError(f"Nepodporované rozlíšenie: {resolution}")
+        coin_ids = sorted(set(coin_ids))
+        step = schemas.OHLC_RESOLUTIONS[resolution]
+        window_seconds = crud.parse_resolution(window)
+        if window_seconds < 2 * step:
+            raise ValueError("Okno musí obsahovať aspoň dve obdobia")
+        if window_seconds // step * len(coin_ids) > MAX_MATRIX_CELLS:
+            raise ValueError("Príliš veľa dát, zvoľte hrubšie rozlíšenie, kratšie okno alebo menej kryptomien")
+
+        async def load(session: AsyncSession):
+            end = datetime.now(timezone.utc)
+            start = end - timedelta(seconds=window_seconds)
+            prices = await load_close_matrix(session, coin_ids, resolution, start, end)
+            result = await asyncio.to_thread(compute_metrics, prices, step, max(rolling, 1), include_correlation)
+            metrics = {name: _to_list(values) for name, values in result["metrics"].items()}
+
+            return {
+                "window": window,
+                "resolution": resolution,
+                "rolling": rolling,
+                "from": start.isoformat(),
+                "to": end.isoformat(),
+                "periods": len(prices),
+                "coins": [
+                    {"coin_id": coin_id, **{name: values[i] for name, values in metrics.items()}}
+                    for i, coin_id in enumerate(coin_ids)
+                ],
+                "correlation": {
+                    "coin_ids": coin_ids,
+                    "matrix": [_to_list(row) for row in result["correlation"]]
+                } if result["correlation"] is not None else None
+            }
+
+        ids_hash = hashlib.sha1(",".join(coin_ids).encode()).hexdigest()
+        return await cached_json("analytics", f"{window}:{resolution}:{rolling}:{include_correlation}:{ids_hash}", load, db)
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v get_analytics")
+        raise
\ No newline at end of file
@@ -1,53 +1,249 @@
-from fastapi import BackgroundTasks
-from sqlalchemy.orm import Session
-import crud
-from redis_client import redis_client
+from sqlalchemy import select
+import schemas
+import ingestion
+import coingecko
+from database import AsyncSessionLocal
+from redis_client import async_redis_client, MARKET_RANK_KEY
+from ratelimit import backoff_delay
+from leader import LeaderLease, run_as_leader
+from config import settings
+from metrics import (
+    PRICE_REFRESH_DURATION,
+    PRICE_REFRESH_LAG,
+    PRICE_REFRESH_COINS,
+    PRICE_REFRESH_ERRORS,
+    PRICE_LAST_REFRESH
+)
+from typing import List, Set
 import asyncio
+import math
+import time
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Globálna premenná pre sledovanie, či je úloha spustená
+# Kľúč zámku, ktorého držiteľ je jediným zapisovateľom cien v celom klastri
+INGESTION_LEADER_KEY = "leader:ingestion"
+
+# Globálna premenná pre sledovanie, či je úloha spustená (v rámci procesu)
 price_update_task = None
 
-async def update_prices_periodically(db: Session, interval: int = 60):
+class RefreshScheduler:
+    """
+    Plánovač obnovy cien s prioritami
+
+    Každá kryptomena má čas ďalšej obnovy. "Horúce" kryptomeny (top
+    PRICE_HOT_COINS podľa trhovej kapitalizácie) sa obnovujú každých
+    PRICE_HOT_INTERVAL sekúnd, ostatné každých PRICE_UPDATE_INTERVAL
+    sekúnd. Ak rozpočet požiadaviek nestačí na všetky splatné kryptomeny,
+    prednosť majú horúce a potom tie, ktoré čakajú najdlhšie.
+    """
+
+    def __init__(self, hot_interval: float, cold_interval: float):
+        self.hot_interval = hot_interval
+        self.cold_interval = cold_interval
+        self._next_due = {}  # coin_id -> time.monotonic() ďalšej obnovy
+
+    def due(self, coin_ids: List[str], hot: Set[str], limit: int) -> List[str]:
+        """
+        Vráti najviac limit splatných kryptomien v poradí priority
+        """
+        now = time.monotonic()
+        # Kryptomeny odstránené z databázy už nesledujeme
+        known = set(coin_ids)
+        for coin_id in [coin_id for coin_id in self._next_due if coin_id not in known]:
+            del self._next_due[coin_id]
+
+        due = [coin_id for coin_id in coin_ids if self._next_due.get(coin_id, 0) <= now]
+        due.sort(key=lambda coin_id: (coin_id not in hot, self._next_due.get(coin_id, 0)))
+        return due[:limit]
+
+    def mark_refreshed(self, coin_ids: List[str], hot: Set[str]):
+        now = time.monotonic()
+        for coin_id in coin_ids:
+            interval = self.hot_interval if coin_id in hot else self.cold_interval
+            self._next_due[coin_id] = now + interval
+
+    def lag(self, coin_ids: List[str]) -> float:
+        """
+        O koľko sekúnd je najstaršia splatná obnova po termíne (nové kryptomeny sa nerátajú)
+        """
+        scheduled = [self._next_due[coin_id] for coin_id in coin_ids if coin_id in self._next_due]
+        if not scheduled:
+            return 0.0
+        return max(time.monotonic() - min(scheduled), 0.0)
+
+    def seconds_until_due(self, coin_ids: List[str]) -> float:
+        """
+        Čas do najbližšej splatnej obnovy (0 ak je niečo splatné už teraz)
+        """
+        if not coin_ids:
+            return self.cold_interval
+        earliest = min(self._next_due.get(coin_id, 0) for coin_id in coin_ids)
+        return max(earliest - time.monotonic(), 0.0)
+
+async def _hot_coins() -> Set[str]:
+    """
+    Top PRICE_HOT_COINS kryptomien podľa trhovej kapitalizácie (z rebríčka v Redis)
+    """
+    if settings.PRICE_HOT_COINS <= 0:
+        return set()
+    return set(await async_redis_client.zrevrange(MARKET_RANK_KEY.format("market_cap"), 0, settings.PRICE_HOT_COINS - 1))
+
+async def update_prices_periodically(interval: int = settings.PRICE_UPDATE_INTERVAL):
     """
     Periodicky aktualizuje ceny kryptomien
-    
+
+    Je jediným zapisovateľom do tabuľky coin_prices, čítacie endpointy
+    servírujú iba uložený snapshot. HTTP aj databázové volania sú
+    asynchrónne, takže aktualizácia neblokuje event loop.
+
+    V každom cykle sa obnovia iba splatné kryptomeny (RefreshScheduler),
+    a to najviac toľko dávok, koľko dovoľuje rozpočet požiadaviek na
+    CoinGecko (coingecko.rate_limiter). Po chybe sa čaká exponenciálne
+    dlhšie s náhodným rozptylom, po 429 aspoň podľa Retry-After.
+
     Args:
-        db: SQLAlchemy session
-        interval: Interval aktualizácie v sekundách (default: 60)
+        interval: Interval aktualizácie menej sledovaných kryptomien v sekundách (default: PRICE_UPDATE_INTERVAL)
     """
+    scheduler = RefreshScheduler(min(settings.PRICE_HOT_INTERVAL, interval), interval)
+    batch_size = max(settings.PRICE_BATCH_SIZE, 1)
+    failures = 0
     while True:
         try:
-            # Získame všetky coin IDs z databázy
-            coins = db.query(crud.schemas.Coin).all()
-            coin_ids = [coin.coin_id for coin in coins]
-            
-            if coin_ids:
-                # Aktualizujeme ceny
-                crud.update_coin_prices(db, coin_ids)
-                logger.info(f"Ceny boli aktualizované pre {len(coin_ids)} kryptomien")
-                
-                # Uložíme čas poslednej aktualizácie do Redis
-                redis_client.set("last_price_update", datetime.now().isoformat())
-            
-            # Počkáme na ďalší interval
-            await asyncio.sleep(interval)
-            
+            started = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                # Získame všetky coin IDs z databázy
+                result = await db.execute(select(schemas.Coin.coin_id))
+                coin_ids = list(result.scalars())
+                hot = await _hot_coins()
+                PRICE_REFRESH_LAG.set(scheduler.lag(coin_ids))
+
+                # Splatné kryptomeny v rámci aktuálneho rozpočtu (aspoň jedna dávka)
+                batches = max(math.floor(coingecko.rate_limiter.available()), 1)
+                due = scheduler.due(coin_ids, hot, batches * batch_size)
+
+                if due:
+                    # Aktualizujeme ceny
+                    stats = await ingestion.update_coin_prices(db, due)
+                    # Kryptomeny zo zlyhaných dávok ostanú splatné pre ďalší cyklus
+                    scheduler.mark_refreshed(stats["refreshed"], hot)
+                    logger.info(
+                        f"Ceny boli aktualizované pre {len(stats['refreshed'])} z {len(due)} splatných "
+                        f"({len(coin_ids)} celkom): {stats['changed']} zmenených, "
+                        f"{stats['unchanged']} nezmenených, {stats['missing']} bez ceny, "
+                        f"{stats['failed']} v zlyhaných dávkach"
+                    )
+
+                    for field in ("changed", "unchanged", "missing", "failed"):
+                        PRICE_REFRESH_COINS.labels(field).inc(stats[field])
+                    PRICE_REFRESH_DURATION.observe(time.perf_counter() - started)
+                    PRICE_LAST_REFRESH.set_to_current_time()
+
+                    # Uložíme čas poslednej aktualizácie do Redis
+                    await async_redis_client.set("last_price_update", datetime.now().isoformat())
+
+            failures = 0
+            # Počkáme na najbližšiu splatnú obnovu
+            await asyncio.sleep(min(max(scheduler.seconds_until_due(coin_ids), 1.0), interval))
+
         except Exception as e:
-            logger.error(f"Chyba pri aktualizácii cien: {str(e)}")
-            await asyncio.sleep(5)  # Počkáme 5 sekúnd pred ďalším pokusom
+            delay = backoff_delay(failures, settings.PRICE_RETRY_BASE_DELAY, settings.PRICE_RETRY_MAX_DELAY)
+            if isinstance(e, coingecko.RateLimitError):
+                delay = max(delay, e.retry_after)
+            failures += 1
+            PRICE_REFRESH_ERRORS.inc()
+            logger.error(f"Chyba pri aktualizácii cien (pokus {failures}, ďalší o {delay:.1f} s): {str(e)}")
+            await asyncio.sleep(delay)
 
-def start_price_updates(db: Session):
+async def refresh_metadata_periodically(interval: int = settings.METADATA_REFRESH_CHECK_INTERVAL):
     """
-    Spustí periodické aktualizácie cien v pozadí
-    
+    Pomaly obnovuje metadáta kryptomien staršie ako METADATA_REFRESH_INTERVAL
+
+    Metadáta sa menia zriedka, preto sa v cykle obnoví najviac
+    METADATA_REFRESH_BATCH kryptomien a iba z rozpočtu požiadaviek,
+    ktorý zostane nad jednu dávku rezervovanú pre aktualizáciu cien.
+
     Args:
-        db: SQLAlchemy session
+        interval: Interval hľadania splatných metadát v sekundách (default: METADATA_REFRESH_CHECK_INTERVAL)
+    """
+    while True:
+        try:
+            limit = min(settings.METADATA_REFRESH_BATCH, math.floor(coingecko.rate_limiter.available()) - 1)
+            if limit > 0:
+                async with AsyncSessionLocal() as db:
+                    stats = await ingestion.refresh_coin_metadata(db, limit)
+                if stats["checked"] or stats["failed"]:
+                    logger.info(
+                        f"Metadáta boli skontrolované pre {stats['checked']} kryptomien: "
+                        f"{stats['changed']} zmenených, {stats['failed']} chýb"
+                    )
+        except Exception as e:
+            logger.error(f"Chyba pri obnove metadát: {str(e)}")
+        await asyncio.sleep(interval)
+
+async def refresh_fx_periodically(interval: int = settings.FX_REFRESH_INTERVAL):
+    """
+    Periodicky obnovuje výmenné kurzy voči USD (jedna požiadavka na cyklus)
+
+    Args:
+        interval: Interval obnovy v sekundách (default: FX_REFRESH_INTERVAL)
+    """
+    failures = 0
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                count = await ingestion.refresh_fx_rates(db)
+            logger.info(f"Výmenné kurzy boli obnovené pre {count} mien")
+            failures = 0
+            await asyncio.sleep(interval)
+        except Exception as e:
+            delay = min(backoff_delay(failures, settings.PRICE_RETRY_BASE_DELAY, settings.PRICE_RETRY_MAX_DELAY), interval)
+            if isinstance(e, coingecko.RateLimitError):
+                delay = max(delay, e.retry_after)
+            failures += 1
+            logger.error(f"Chyba pri obnove výmenných kurzov (pokus {failures}, ďalší o {delay:.1f} s): {str(e)}")
+            await asyncio.sleep(delay)
+
+async def run_ingestion():
+    """
+    Úlohy vodcu: aktualizácia cien, výmenných kurzov a obnova metadát
+    """
+    await asyncio.gather(
+        update_prices_periodically(),
+        refresh_fx_periodically(),
+        refresh_metadata_periodically()
+    )
+
+async def run_price_updates():
+    """
+    Spúšťa aktualizácie cien (a kurzov, metadát) iba v procese, ktorý je vodcom
+
+    Ostatné procesy (API workery, repliky, ďalšie workery) čakajú
+    a prevezmú úlohu, ak vodca prestane obnovovať prenájom.
+    """
+    lease = LeaderLease(INGESTION_LEADER_KEY, settings.INGESTION_LEASE_TTL)
+    await run_as_leader(lease, run_ingestion)
+
+def start_price_updates():
+    """
+    Spustí periodické aktualizácie cien v pozadí (s voľbou vodcu)
     """
     global price_update_task
     if price_update_task is None:
-        price_update_task = asyncio.create_task(update_prices_periodically(db))
-        logger.info("Background task pre aktualizáciu cien bol spustený") 
\ No newline at end of file
+        price_update_task = asyncio.create_task(run_price_updates())
+        logger.info("Background task pre aktualizáciu cien bol spustený")
+
+async def stop_price_updates():
+    """
+    Zastaví aktualizácie cien a uvoľní vodcovstvo pre iný proces
+    """
+    global price_update_task
+    if price_update_task is not None:
+        price_update_task.cancel()
+        try:
+            await price_update_task
+        except asyncio.CancelledError:
+            pass
+        price_update_task = None
@@ -0,0 +1,175 @@
+import httpx
+from config import settings
+from singleflight import AsyncSingleFlight
+from ratelimit import SharedTokenBucket
+from redis_client import async_redis_client, COINGECKO_RATE_LIMIT_KEY
+from metrics import COINGECKO_REQUEST_DURATION, COINGECKO_RATE_LIMIT_WAIT, COINGECKO_RATE_LIMIT_TOKENS
+from typing import Optional, List
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Hodnoty COINGECKO_API_KEY, ktoré neznamenajú skutočný kľúč
+_PLACEHOLDER_API_KEYS = {"", "your_api_key_here"}
+
+# Zdieľaný HTTP klient s poolom keep-alive spojení pre CoinGecko API
+_client: Optional[httpx.AsyncClient] = None
+
+# Súbežné rovnaké požiadavky na CoinGecko sa zlúčia do jednej
+_flights = AsyncSingleFlight()
+
+# Spoločný rozpočet požiadaviek na CoinGecko pre všetky procesy (API aj worker)
+rate_limiter = SharedTokenBucket(
+    async_redis_client,
+    COINGECKO_RATE_LIMIT_KEY,
+    settings.COINGECKO_RATE_LIMIT / 60,
+    settings.COINGECKO_RATE_BURST
+)
+COINGECKO_RATE_LIMIT_TOKENS.set_function(rate_limiter.available)
+
+class RateLimitError(ValueError):
+    """
+    CoinGecko odmietlo požiadavku pre prekročenie limitu (HTTP 429)
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Prekročený limit CoinGecko API, ďalší pokus o {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+def _auth_headers() -> dict:
+    """
+    Hlavička s API kľúčom (Pro API má iný názov hlavičky ako Demo API)
+    """
+    api_key = settings.COINGECKO_API_KEY.strip()
+    if api_key in _PLACEHOLDER_API_KEYS:
+        return {}
+    if "pro-api.coingecko.com" in settings.COINGECKO_API_URL:
+        return {"x-cg-pro-api-key": api_key}
+    return {"x-cg-demo-api-key": api_key}
+
+def _retry_after(response: httpx.Response) -> float:
+    try:
+        return max(float(response.headers.get("retry-after", 60)), 1.0)
+    except ValueError:
+        return 60.0
+
+async def _get(path: str, params: dict) -> httpx.Response:
+    """
+    GET na CoinGecko v rámci rozpočtu rate_limiter
+
+    Pri odpovedi 429 pozastaví rozpočet (pre všetky procesy) podľa Retry-After
+    a vyhodí RateLimitError.
+    """
+    start = time.perf_counter()
+    await rate_limiter.acquire()
+    COINGECKO_RATE_LIMIT_WAIT.observe(time.perf_counter() - start)
+
+    # /coins/{id} zlúčime do jednej série bez ohľadu na ID
+    endpoint = "/coins/{id}" if path.startswith("/coins/") else path
+    start = time.perf_counter()
+    try:
+        response = await get_client().get(path, params=params)
+    except httpx.HTTPError:
+        COINGECKO_REQUEST_DURATION.labels(endpoint, "error").observe(time.perf_counter() - start)
+        raise
+    COINGECKO_REQUEST_DURATION.labels(endpoint, str(response.status_code)).observe(time.perf_counter() - start)
+    if response.status_code == 429:
+        retry_after = _retry_after(response)
+        await rate_limiter.pause(retry_after)
+        logger.warning(f"CoinGecko vrátilo 429, požiadavky pozastavené na {retry_after:.0f} s")
+        raise RateLimitError(retry_after)
+    return response
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Vráti zdieľaného asynchrónneho HTTP klienta, pri prvom volaní ho vytvorí
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=settings.COINGECKO_API_URL,
+            timeout=httpx.Timeout(settings.COINGECKO_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.COINGECKO_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.COINGECKO_MAX_CONNECTIONS,
+                keepalive_expiry=30
+            ),
+            headers={"accept": "application/json", **_auth_headers()}
+        )
+    return _client
+
+async def close_client():
+    """
+    Uzavrie zdieľaného HTTP klienta (pri vypnutí aplikácie)
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def fetch_simple_prices(coin_ids: List[str]) -> dict:
+    """
+    Získanie aktuálnych cien z endpointu /simple/price
+    """
+    return await _flights.do(
+        f"simple_price:{','.join(sorted(coin_ids))}",
+        lambda: _fetch_simple_prices(coin_ids)
+    )
+
+async def _fetch_simple_prices(coin_ids: List[str]) -> dict:
+    response = await _get(
+        "/simple/price",
+        {
+            "ids": ",".join(coin_ids),
+            "vs_currencies": "usd",
+            "include_market_cap": "true",
+            "include_24hr_vol": "true",
+            "include_24hr_change": "true",
+            "include_last_updated_at": "true",
+            "precision": "4"  # Pridané pre presnosť na 4 desatinné miesta
+        }
+    )
+
+    if response.status_code != 200:
+        raise ValueError(f"Chyba pri získavaní dát z CoinGecko API: {response.status_code}")
+
+    return response.json()
+
+async def fetch_coin(coin_id: str) -> dict:
+    """
+    Získanie detailu kryptomeny z endpointu /coins/{id}
+    """
+    return await _flights.do(f"coin:{coin_id}", lambda: _fetch_coin(coin_id))
+
+async def _fetch_coin(coin_id: str) -> dict:
+    response = await _get(
+        f"/coins/{coin_id}",
+        {
+            "localization": "false",
+            "tickers": "false",
+            "market_data": "false",
+            "community_data": "false",
+            "developer_data": "false",
+            "sparkline": "false"
+        }
+    )
+
+    if response.status_code != 200:
+        raise ValueError(f"Kryptomena s ID {coin_id} nebola nájdená v CoinGecko API")
+
+    return response.json()
+
+async def fetch_exchange_rates() -> dict:
+    """
+    Získanie výmenných kurzov z endpointu /exchange_rates (hodnoty voči 1 BTC)
+    """
+    return await _flights.do("exchange_rates", _fetch_exchange_rates)
+
+async def _fetch_exchange_rates() -> dict:
+    response = await _get("/exchange_rates", {})
+
+    if response.status_code != 200:
+        raise ValueError(f"Chyba pri získavaní výmenných kurzov z CoinGecko API: {response.status_code}")
+
+    return response.json()["rates"]
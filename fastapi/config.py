@@ -4,10 +4,20 @@ from functools import lru_cache
 class Settings(BaseSettings):
     # Databázové nastavenia
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5  # Počet trvalých spojení v poole (na engine a proces)
+    DB_MAX_OVERFLOW: int = 10  # Počet dočasných spojení nad DB_POOL_SIZE pri špičke
+    DB_POOL_TIMEOUT: float = 10.0  # Ako dlho čakať na voľné spojenie z poolu v sekundách
+    DB_POOL_RECYCLE: int = 1800  # Maximálny vek spojenia v sekundách, potom sa otvorí nové
+    DB_POOL_PRE_PING: bool = True  # Overiť spojenie pred použitím (po reštarte DB alebo výpadku siete)
+    DB_STATEMENT_TIMEOUT: int = 30000  # Maximálna dĺžka SQL príkazu v milisekundách (0 = bez limitu)
     
     # CoinGecko API
     COINGECKO_API_KEY: str
     COINGECKO_API_URL: str
+    COINGECKO_TIMEOUT: float = 10.0  # Timeout HTTP požiadavky v sekundách
+    COINGECKO_MAX_CONNECTIONS: int = 20  # Veľkosť poolu HTTP spojení
+    COINGECKO_RATE_LIMIT: int = 30  # Rozpočet požiadaviek za minútu (Demo API kľúč: 30)
+    COINGECKO_RATE_BURST: int = 5  # Maximálny počet požiadaviek odoslaných naraz z ušetreného rozpočtu
     
     # FastAPI nastavenia
     APP_HOST: str
@@ -16,6 +26,40 @@ class Settings(BaseSettings):
     # Redis nastavenia
     REDIS_HOST: str
     REDIS_PORT: int
+    L1_CACHE_SIZE: int = 10000  # Maximálny počet záznamov in-process L1 cache
+    L1_CACHE_TTL: int = 30  # Maximálny vek záznamu v L1 cache v sekundách
+    CACHE_STALE_TTL: int = 30  # Ako dlho po TTL sa ešte servíruje zastaraný záznam počas obnovy
+    CACHE_DISTRIBUTED_LOCK: bool = True  # Zlučovanie výpočtov naprieč procesmi cez Redis zámok
+    CACHE_LOCK_TIMEOUT: float = 5.0  # Platnosť Redis zámku pre výpočet v sekundách
+    
+    # Nastavenia aktualizácie cien
+    PRICE_UPDATE_INTERVAL: int = 60  # Interval aktualizácie menej sledovaných kryptomien v sekundách
+    PRICE_HOT_COINS: int = 100  # Počet top kryptomien (podľa kapitalizácie) s častejšou aktualizáciou
+    PRICE_HOT_INTERVAL: int = 20  # Interval aktualizácie top kryptomien v sekundách
+    PRICE_RETRY_BASE_DELAY: float = 1.0  # Základ exponenciálneho backoffu po chybe v sekundách
+    PRICE_RETRY_MAX_DELAY: float = 300.0  # Maximálne čakanie po opakovaných chybách v sekundách
+    RUN_INGESTION_IN_API: bool = True  # Spúšťať aktualizáciu cien aj v API procesoch (inak iba worker.py)
+    WORKER_METRICS_PORT: int = 9100  # Port s metrikami pre Prometheus vo worker.py (0 = vypnuté)
+    INGESTION_LEASE_TTL: float = 15.0  # Platnosť vodcovstva aktualizácie cien, určuje čas prevzatia po páde
+    ONBOARDING_CONCURRENCY: int = 8  # Súbežné sťahovanie metadát pri hromadnom pridaní kryptomien
+    ONBOARDING_MAX_COINS: int = 10000  # Maximálny počet kryptomien v jednej úlohe hromadného pridania
+    PRICE_MAX_STALENESS: int = 300  # Maximálny vek cien v sekundách, potom sú označené ako zastarané
+    PRICE_BATCH_SIZE: int = 250  # Počet coin IDs v jednej požiadavke na /simple/price
+    PRICE_FETCH_CONCURRENCY: int = 4  # Maximálny počet súbežných požiadaviek na CoinGecko
+    FX_REFRESH_INTERVAL: int = 600  # Interval obnovy výmenných kurzov v sekundách
+    
+    # Nastavenia obnovy metadát
+    METADATA_REFRESH_INTERVAL: int = 604800  # Maximálny vek metadát kryptomeny v sekundách (7 dní)
+    METADATA_REFRESH_CHECK_INTERVAL: int = 600  # Ako často sa hľadajú metadáta splatné na obnovu v sekundách
+    METADATA_REFRESH_BATCH: int = 20  # Maximálny počet kryptomien, ktorých metadáta sa obnovia v jednom cykle
+    
+    # Streaming cien (WebSocket / SSE)
+    STREAM_HEARTBEAT_INTERVAL: int = 15  # Interval keep-alive správ pre klientov bez zmien v sekundách
+    STREAM_MAX_COIN_IDS: int = 1000  # Maximálny počet kryptomien v odbere cez WebSocket správu
+    
+    # Export cien (/export/prices)
+    EXPORT_CHUNK_SIZE: int = 5000  # Počet riadkov načítaných zo server-side kurzora naraz
+    EXPORT_MAX_CONCURRENT: int = 2  # Maximálny počet súbežných exportov na proces (každý drží DB spojenie)
     
     class Config:
         env_file = "../.env"
@@ -1,378 +1,758 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, contains_eager, selectinload
+from sqlalchemy import select, delete, func, or_
+from sqlalchemy.dialects.postgresql import array_agg, aggregate_order_by
 import schemas
-import models
-import requests
 from config import settings
-from redis_client import redis_client
+from redis_client import (
+    async_redis_client,
+    cached,
+    cached_json,
+    cache_delete,
+    invalidate_cache,
+    MARKET_RANK_KEY,
+    MARKET_RANK_FIELDS,
+    PRICE_SNAPSHOT_KEY
+)
 import json
+import base64
+import logging
+import re
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+from serialization import dumps
 
-def get_coin(db: Session, coin_id: str, include_metadata: bool = False):
+logger = logging.getLogger(__name__)
+
+def _with_age(price_data: dict) -> dict:
+    """
+    Vráti kópiu cenových dát doplnenú o ich vek a príznak zastaranosti
+
+    Dáta z cache sú zdieľané (L1 cache), preto sa nemenia na mieste.
+    """
+    timestamp = price_data.get("last_updated_at") or price_data.get("updated_at")
+    age_seconds = None
+    if timestamp:
+        last_updated = datetime.fromisoformat(timestamp)
+        if last_updated.tzinfo is None:
+            last_updated = last_updated.replace(tzinfo=timezone.utc)
+        age_seconds = max((datetime.now(timezone.utc) - last_updated).total_seconds(), 0.0)
+
+    return {
+        **price_data,
+        "age_seconds": age_seconds,
+        "stale": age_seconds is None or age_seconds > settings.PRICE_MAX_STALENESS
+    }
+
+def with_price_ages(coins: List[dict]) -> List[dict]:
+    """
+    Prepočíta vek cien v zozname kryptomien (napr. po načítaní z cache)
+    """
+    return [
+        {**coin_data, "price": _with_age(coin_data["price"])} if coin_data.get("price") else coin_data
+        for coin_data in coins
+    ]
+
+def _coin_to_dict(coin: schemas.Coin, include_metadata: bool = False) -> dict:
+    """
+    Prevedie ORM objekt Coin na slovník s dátumami v ISO formáte
+    """
+    # Tvar zodpovedá models.Coin, aby sa dal z cache vrátiť priamo bez validácie
+    return {
+        "coin_id": coin.coin_id,
+        "symbol": coin.symbol,
+        "name": coin.name,
+        "created_at": coin.created_at.isoformat() if coin.created_at else None,
+        "updated_at": coin.updated_at.isoformat() if coin.updated_at else None,
+        # Pridáme metadata ak sú požadované a existujú
+        "metadata": (coin.metadata_entry.data if coin.metadata_entry else None) if include_metadata else None,
+        "price": None
+    }
+
+async def get_coin_json(db: AsyncSession, coin_id: str, include_metadata: bool = False) -> bytes:
+    """
+    Detail kryptomeny ako vyrenderované JSON bajty (priamo z cache)
+    """
     try:
-        # Skúsime získať dáta z Redis cache
-        cache_key = f"coin:{coin_id}:{include_metadata}"
-        cached_data = redis_client.get(cache_key)
-        
-        if cached_data:
-            try:
-                return models.Coin(**json.loads(cached_data))
-            except Exception as e:
-                print(f"Chyba pri deserializácii cache dát: {e}")
-                # Ak je problém s cache, pokračujeme s databázou
-        
-        # Ak nie sú v cache alebo je problém s cache, získame z databázy
-        coin = db.query(schemas.Coin).filter(schemas.Coin.coin_id == coin_id).first()
-        
-        if not coin:
-            raise ValueError(f"Kryptomena s ID {coin_id} nebola nájdená")
-        
-        try:
-            # Uložíme do cache na 10 sekúnd
-            coin_data = {
-                "coin_id": coin.coin_id,
-                "symbol": coin.symbol,
-                "name": coin.name,
-                "created_at": coin.created_at.isoformat() if coin.created_at else None,
-                "updated_at": coin.updated_at.isoformat() if coin.updated_at else None
-            }
-            
-            if include_metadata and coin.coin_metadata:
-                coin_data["metadata"] = coin.coin_metadata
+        async def load(session: AsyncSession):
+            query = select(schemas.Coin).where(schemas.Coin.coin_id == coin_id)
+            if include_metadata:
+                query = query.options(joinedload(schemas.Coin.metadata_entry))
+            coin = await session.scalar(query)
             
-            redis_client.setex(
-                cache_key,
-                10,  # 10 sekúnd
-                json.dumps(coin_data)
-            )
-        except Exception as e:
-            print(f"Chyba pri ukladaní do cache: {e}")
-        
-        # Vrátime coin s metadátami ak je to požadované
-        if include_metadata:
-            return models.Coin(
-                coin_id=coin.coin_id,
-                symbol=coin.symbol,
-                name=coin.name,
-                created_at=coin.created_at,
-                updated_at=coin.updated_at,
-                metadata=coin.coin_metadata if coin.coin_metadata else None
-            )
-        else:
-            # Ak nechceme metadáta, vrátime len základné informácie
-            return models.Coin(
-                coin_id=coin.coin_id,
-                symbol=coin.symbol,
-                name=coin.name,
-                created_at=coin.created_at,
-                updated_at=coin.updated_at
-            )
-    except Exception as e:
-        print(f"Chyba v get_coin: {e}")
+            if not coin:
+                raise ValueError(f"Kryptomena s ID {coin_id} nebola nájdená")
+            return _coin_to_dict(coin, include_metadata)
+
+        return await cached_json("coin", f"{coin_id}:{include_metadata}", load, db)
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v get_coin_json")
         raise
 
-def get_coins(db: Session, skip: int = 0, limit: int = 100, include_metadata: bool = False, include_prices: bool = False):
+async def get_coin_etag(db: AsyncSession, coin_id: str) -> str:
+    """
+    ETag detailu kryptomeny s metadátami
+
+    Skladá sa z content_hash metadát a času poslednej zmeny riadku coins,
+    takže sa dá overiť bez načítania a serializácie samotných metadát.
+    """
     try:
-        cache_key = f"coins:skip:{skip}:limit:{limit}:{include_metadata}:{include_prices}"
-        cached_data = redis_client.get(cache_key)
-        
-        if cached_data:
-            try:
-                return [models.Coin(**coin_data) for coin_data in json.loads(cached_data)]
-            except Exception as e:
-                print(f"Chyba pri deserializácii cache dát: {e}")
-                # Ak je problém s cache, pokračujeme s databázou
-        
-        # Získame celkový počet kryptomien
-        total_count = db.query(schemas.Coin).count()
-        
-        # Získame kryptomeny s podporou stránkovania
-        coins = db.query(schemas.Coin).order_by(schemas.Coin.coin_id).offset(skip).limit(limit).all()
-        
-        # Ak chceme ceny, najprv aktualizujeme ceny pre všetky kryptomeny
-        if include_prices and coins:
-            coin_ids = [coin.coin_id for coin in coins]
-            update_coin_prices(db, coin_ids)
-        
-        # Vrátime coins s metadátami a cenami podľa požiadaviek
-        result = []
-        for coin in coins:
-            # Vytvoríme základný model Coin
-            coin_data = {
-                "coin_id": coin.coin_id,
-                "symbol": coin.symbol,
-                "name": coin.name,
-                "created_at": coin.created_at.isoformat() if coin.created_at else None,
-                "updated_at": coin.updated_at.isoformat() if coin.updated_at else None
-            }
-            
-            # Pridáme metadata ak sú požadované a existujú
-            if include_metadata and coin.coin_metadata:
-                coin_data["metadata"] = coin.coin_metadata
-                
-            # Pridáme ceny ak sú požadované
-            if include_prices:
-                price = db.query(schemas.CoinPrice).filter(schemas.CoinPrice.coin_id == coin.coin_id).first()
-                if price:
-                    coin_data["price"] = {
-                        "usd": float(price.usd) if price.usd else None,
-                        "usd_market_cap": float(price.usd_market_cap) if price.usd_market_cap else None,
-                        "usd_24h_vol": float(price.usd_24h_vol) if price.usd_24h_vol else None,
-                        "usd_24h_change": float(price.usd_24h_change) if price.usd_24h_change else None,
-                        "last_updated_at": price.last_updated_at.isoformat() if price.last_updated_at else None
-                    }
-            
-            result.append(coin_data)
-            
-        # Uložíme do cache
-        try:
-            redis_client.setex(
-                cache_key,
-                10,  # 10 sekúnd
-                json.dumps(result)
+        async def load(session: AsyncSession):
+            row = (await session.execute(
+                select(schemas.Coin.updated_at, schemas.CoinMetadata.content_hash)
+                .outerjoin(schemas.CoinMetadata, schemas.CoinMetadata.coin_id == schemas.Coin.coin_id)
+                .where(schemas.Coin.coin_id == coin_id)
+            )).first()
+
+            if not row:
+                raise ValueError(f"Kryptomena s ID {coin_id} nebola nájdená")
+            updated_at, metadata_hash = row
+            version = int(updated_at.timestamp() * 1000) if updated_at else 0
+            return f'"{(metadata_hash or "none")[:32]}-{version:x}"'
+
+        return await cached("coin", f"{coin_id}:etag", load, db)
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v get_coin_etag")
+        raise
+
+COIN_SORTS = ("coin_id", "market_cap")
+
+# Podporované intervaly pre vzorkovanie histórie cien
+HISTORY_INTERVALS = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "4h": timedelta(hours=4),
+    "1d": timedelta(days=1)
+}
+# Začiatok okien pre date_bin: pondelok o polnoci UTC, aby týždenné okná (1w) začínali v pondelok
+HISTORY_BUCKET_ORIGIN = datetime(2000, 1, 3, tzinfo=timezone.utc)
+
+OHLC_RESOLUTION_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def encode_cursor(sort: str, coin_id: str, market_cap: Optional[str] = None) -> str:
+    """
+    Zakóduje pozíciu poslednej položky stránky do neprehľadného kurzora
+    """
+    payload = json.dumps({"s": sort, "k": coin_id, "m": market_cap}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> dict:
+    """
+    Dekóduje kurzor vytvorený funkciou encode_cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort or not isinstance(payload["k"], str):
+            raise ValueError
+        # Kapitalizáciu porovnávame ako Decimal, aby PostgreSQL mohol použiť index na Numeric stĺpci
+        payload["m"] = Decimal(payload["m"]) if payload.get("m") is not None else None
+        return payload
+    except Exception:
+        raise ValueError("Neplatný kurzor pre stránkovanie")
+
+def _coins_family(sort: str, include_prices: bool) -> str:
+    """
+    Rodina cache pre stránku zoznamu: stránky závislé od cien sa invalidujú
+    pri každej zmene cien, ostatné iba pri zmene kryptomien alebo metadát
+    """
+    return "coins_prices" if include_prices or sort == "market_cap" else "coins"
+
+def _coins_position(cursor: Optional[str], sort: str) -> Optional[dict]:
+    """
+    Overí zoradenie zoznamu kryptomien a dekóduje kurzor (None pre prvú stránku)
+    """
+    if sort not in COIN_SORTS:
+        raise ValueError(f"Nepodporované zoradenie: {sort}")
+    return decode_cursor(cursor, sort) if cursor else None
+
+async def count_coins(db: AsyncSession) -> int:
+    """
+    Celkový počet kryptomien, cachovaný v Redis
+    """
+    async def load(session: AsyncSession):
+        return await session.scalar(select(func.count(schemas.Coin.coin_id)))
+
+    return await cached("count", "all", load, db)
+
+async def get_coins(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    sort: str = "coin_id",
+    include_metadata: bool = False,
+    include_prices: bool = False,
+    include_total: bool = False
+):
+    """
+    Stránkovaný zoznam kryptomien s kurzorovým (keyset) stránkovaním
+
+    Namiesto OFFSET sa pokračuje za poslednou položkou predchádzajúcej
+    stránky, takže hlboké stránky sú rovnako rýchle ako prvá. Pri
+    sort="market_cap" sa zoraďuje podľa usd_market_cap zostupne
+    (kryptomeny bez kapitalizácie sú na konci) a potom podľa coin_id.
+    """
+    try:
+        position = _coins_position(cursor, sort)
+
+        page = await cached(
+            _coins_family(sort, include_prices),
+            f"{cursor}:{limit}:{sort}:{include_metadata}:{include_prices}",
+            lambda session: _load_coins_page(session, position, limit, sort, include_metadata, include_prices),
+            db
+        )
+        # Vek cien počítame až pri čítaní, aby bol aktuálny aj pre dáta z cache
+        return {
+            **page,
+            "items": with_price_ages(page["items"]),
+            "total": await count_coins(db) if include_total else None
+        }
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v get_coins")
+        raise
+
+async def get_coins_json(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    sort: str = "coin_id",
+    include_metadata: bool = False,
+    include_prices: bool = False,
+    include_total: bool = False
+) -> bytes:
+    """
+    Stránka kryptomien ako JSON bajty (tvar models.CoinPage)
+
+    Bez cien je celá odpoveď nemenná až do invalidácie, vracia sa preto
+    priamo z cache. S cenami sa musí dopočítať ich vek, stránka sa
+    rozparsuje, doplní a vyrenderuje cez orjson.
+    """
+    if include_prices:
+        return dumps(await get_coins(db, cursor, limit, sort, include_metadata, include_prices, include_total))
+
+    try:
+        position = _coins_position(cursor, sort)
+
+        async def load(session: AsyncSession):
+            page = await _load_coins_page(session, position, limit, sort, include_metadata, False)
+            return {**page, "total": await count_coins(session) if include_total else None}
+
+        return await cached_json(_coins_family(sort, False), f"{cursor}:{limit}:{sort}:{include_metadata}:False:{include_total}", load, db)
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v get_coins_json")
+        raise
+
+async def _load_market_cap_coins(db: AsyncSession, position: Optional[dict], count: int, include_metadata: bool) -> list:
+    """
+    Najviac count kryptomien zoradených podľa usd_market_cap zostupne, potom podľa coin_id
+
+    Dopyt vychádza z coin_prices, aby sa poradie aj začiatok stránky dali
+    čítať priamo z indexu ix_coin_prices_market_cap_coin_id (podmienka
+    usd_market_cap <= m je rozsah indexu, zvyšok iba filter rovnakých
+    hodnôt). Kryptomeny bez kapitalizácie (alebo bez ceny) nasledujú na
+    konci ako samostatný keyset podľa coin_id.
+    """
+    market_cap = schemas.CoinPrice.usd_market_cap
+    coins = []
+
+    # 1. Kryptomeny s kapitalizáciou (ak kurzor ešte nie je v chvoste bez nej)
+    if position is None or position["m"] is not None:
+        query = (
+            select(schemas.Coin)
+            .join(schemas.CoinPrice, schemas.CoinPrice.coin_id == schemas.Coin.coin_id)
+            .options(contains_eager(schemas.Coin.price))
+            .where(market_cap.is_not(None))
+            .order_by(market_cap.desc().nulls_last(), schemas.CoinPrice.coin_id)
+            .limit(count)
+        )
+        if position is not None:
+            query = query.where(
+                market_cap <= position["m"],
+                or_(market_cap < position["m"], schemas.CoinPrice.coin_id > position["k"])
             )
-        except Exception as e:
-            print(f"Chyba pri ukladaní do cache: {e}")
-            
-        return result
-    except Exception as e:
-        print(f"Chyba v get_coins: {e}")
+        if include_metadata:
+            query = query.options(selectinload(schemas.Coin.metadata_entry))
+        coins = list((await db.scalars(query)).all())
+        if len(coins) >= count:
+            return coins
+
+    # 2. Chvost: kryptomeny bez ceny alebo s cenou bez kapitalizácie
+    query = (
+        select(schemas.Coin)
+        .outerjoin(schemas.Coin.price)
+        .options(contains_eager(schemas.Coin.price))
+        .where(market_cap.is_(None))
+        .order_by(schemas.Coin.coin_id)
+        .limit(count - len(coins))
+    )
+    if position is not None and position["m"] is None:
+        query = query.where(schemas.Coin.coin_id > position["k"])
+    if include_metadata:
+        query = query.options(selectinload(schemas.Coin.metadata_entry))
+    return coins + list((await db.scalars(query)).all())
+
+async def _load_coins_page(db: AsyncSession, position: Optional[dict], limit: int, sort: str, include_metadata: bool, include_prices: bool) -> dict:
+    """
+    Načíta jednu stránku kryptomien z databázy (bez cache)
+    """
+    # Načítame o jeden záznam viac, aby sme vedeli, či existuje ďalšia stránka
+    if sort == "market_cap":
+        coins = await _load_market_cap_coins(db, position, limit + 1, include_metadata)
+    else:
+        # Ceny načítame v tom istom dopyte cez LEFT OUTER JOIN a metadáta iba ak sú požadované
+        query = select(schemas.Coin)
+        if include_prices:
+            query = query.options(joinedload(schemas.Coin.price))
+        if position is not None:
+            query = query.where(schemas.Coin.coin_id > position["k"])
+        query = query.order_by(schemas.Coin.coin_id)
+        if include_metadata:
+            query = query.options(selectinload(schemas.Coin.metadata_entry))
+        coins = (await db.scalars(query.limit(limit + 1))).all()
+    has_next = len(coins) > limit
+    coins = coins[:limit]
+    
+    # Vrátime coins s metadátami a cenami podľa požiadaviek
+    result = []
+    for coin in coins:
+        coin_data = _coin_to_dict(coin, include_metadata)
+
+        # Pridáme ceny ak sú požadované
+        if include_prices and coin.price:
+            coin_data["price"] = coin.price.to_dict()
+        
+        result.append(coin_data)
+
+    next_cursor = None
+    if has_next:
+        last = coins[-1]
+        last_market_cap = None
+        if sort == "market_cap" and last.price and last.price.usd_market_cap is not None:
+            last_market_cap = str(last.price.usd_market_cap)
+        next_cursor = encode_cursor(sort, last.coin_id, last_market_cap)
+
+    return {"items": result, "next_cursor": next_cursor, "total": None}
+
+async def get_top_coins(db: AsyncSession, limit: int = 10, by: str = "market_cap"):
+    """
+    Top kryptomeny podľa trhovej kapitalizácie, 24h objemu alebo 24h zmeny
+
+    Poradie sa číta z Redis sorted setu udržiavaného pri aktualizácii cien
+    (ZREVRANGE, O(log n + N)). Ak rebríček ešte neexistuje (napr. pred
+    prvou aktualizáciou), použije sa zoradenie v databáze.
+    """
+    try:
+        if by not in MARKET_RANK_FIELDS:
+            raise ValueError(f"Nepodporované zoradenie: {by}")
+
+        top_coins = await cached("top", f"{by}:{limit}", lambda session: _load_top_coins(session, limit, by), db)
+
+        # Vek cien počítame až pri čítaní, aby bol aktuálny aj pre dáta z cache
+        return with_price_ages(top_coins)
+    except ValueError:
         raise
+    except Exception:
+        logger.exception("Chyba v get_top_coins")
+        raise
+
+async def _load_top_coins(db: AsyncSession, limit: int, by: str) -> List[dict]:
+    """
+    Načíta rebríček kryptomien (bez cache)
+
+    Zo sorted setu sa číta s rezervou, aby vymazané kryptomeny alebo
+    kryptomeny bez ceny nezmenšili rebríček pod limit. Takých členov zo
+    setu rovno odstráni. Ak set nestačí (napr. pred prvou aktualizáciou),
+    zvyšok doplní zoradenie v databáze.
+    """
+    key = MARKET_RANK_KEY.format(by)
+    query = select(schemas.Coin).join(schemas.Coin.price).options(contains_eager(schemas.Coin.price))
+
+    coins = []
+    offset = 0
+    window = limit * 2
+    while len(coins) < limit:
+        ranked_ids = await async_redis_client.zrevrange(key, offset, offset + window - 1)
+        if not ranked_ids:
+            break
+        found = {coin.coin_id: coin for coin in await db.scalars(query.where(schemas.Coin.coin_id.in_(ranked_ids)))}
+        coins.extend(found[coin_id] for coin_id in ranked_ids if coin_id in found)
+        stale = [coin_id for coin_id in ranked_ids if coin_id not in found]
+        if stale:
+            await async_redis_client.zrem(key, *stale)
+        # Odstránení členovia posunuli ďalšie pozície v sete dopredu
+        offset += len(ranked_ids) - len(stale)
+        if len(ranked_ids) < window:
+            break
 
-def create_coin(db: Session, coin_id: str):
+    if len(coins) < limit:
+        column = getattr(schemas.CoinPrice, MARKET_RANK_FIELDS[by])
+        fallback = query.order_by(column.desc().nulls_last(), schemas.Coin.coin_id).limit(limit - len(coins))
+        if coins:
+            fallback = fallback.where(schemas.Coin.coin_id.not_in([coin.coin_id for coin in coins]))
+        coins.extend(await db.scalars(fallback))
+    coins = coins[:limit]
+
+    result = []
+    for rank, coin in enumerate(coins, start=1):
+        coin_data = _coin_to_dict(coin)
+        coin_data["rank"] = rank
+        coin_data["price"] = coin.price.to_dict()
+        result.append(coin_data)
+    return result
+
+def _time_range(start: Optional[datetime], end: Optional[datetime], default_span: timedelta):
+    """
+    Doplní chýbajúce hranice rozsahu, časy bez časovej zóny považuje za UTC
+    """
+    if end is not None and end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start is not None and start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    end = end or datetime.now(timezone.utc)
+    start = start or end - default_span
+    if start >= end:
+        raise ValueError("Parameter from musí byť menší ako to")
+    return start, end
+
+async def get_price_history(
+    db: AsyncSession,
+    coin_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    interval: Optional[str] = None,
+    limit: int = 5000
+):
+    """
+    História cien jednej kryptomeny v rozsahu <start, end)
+
+    Bez intervalu sa vrátia všetky ticky, dopyt ide cez primárny kľúč
+    (coin_id, ts) a PostgreSQL vynechá mesačné partície mimo rozsahu.
+    S intervalom sa body čítajú z OHLCV rollupov (_load_history_closes).
+    Ak je v rozsahu viac ako limit bodov, vráti sa najnovších limit
+    (truncated=True), staršie sa dajú načítať s to = čas prvého bodu.
+    """
     try:
-        # Najprv skontrolujeme či kryptomena už existuje
-        existing_coin = db.query(schemas.Coin).filter(schemas.Coin.coin_id == coin_id).first()
-        if existing_coin:
-            # Ak kryptomena existuje, aktualizujeme jej ceny
-            update_coin_prices(db, [coin_id])
-            return models.Coin(
-                coin_id=existing_coin.coin_id,
-                symbol=existing_coin.symbol,
-                name=existing_coin.name,
-                created_at=existing_coin.created_at,
-                updated_at=existing_coin.updated_at,
-                metadata=existing_coin.coin_metadata if existing_coin.coin_metadata else None
+        if interval is not None and interval not in HISTORY_INTERVALS:
+            raise ValueError(f"Nepodporovaný interval: {interval}")
+
+        start, end = _time_range(start, end, timedelta(days=1))
+
+        # Načítame o jeden bod viac, aby sme vedeli, či boli staršie body orezané
+        if interval is not None:
+            points = await _load_history_closes(db, coin_id, interval, start, end, limit + 1)
+        else:
+            tick = schemas.CoinPriceTick
+            # Zostupne od najnovších, aby limit orezal najstaršie body
+            query = (
+                select(tick)
+                .where(tick.coin_id == coin_id, tick.ts >= start, tick.ts < end)
+                .order_by(tick.ts.desc())
+                .limit(limit + 1)
             )
+            points = [point.to_dict() for point in await db.scalars(query)]
+        truncated = len(points) > limit
+        points = points[:limit]
+        points.reverse()
 
-        # Overenie existencie kryptomeny cez CoinGecko API
-        response = requests.get(
-            f"{settings.COINGECKO_API_URL}/coins/{coin_id}",
-            params={
-                "localization": "false",
-                "tickers": "false",
-                "market_data": "false",
-                "community_data": "false",
-                "developer_data": "false",
-                "sparkline": "false"
-            }
-        )
+        return {
+            "coin_id": coin_id,
+            "interval": interval,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "truncated": truncated,
+            "points": points
+        }
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v get_price_history")
+        raise
 
-        if response.status_code != 200:
-            raise ValueError(f"Kryptomena s ID {coin_id} nebola nájdená v CoinGecko API")
-
-        coin_data = response.json()
-
-        # Extrahujeme relevantné metadáta
-        metadata = {
-            "description": coin_data.get("description", {}).get("en"),
-            "website_url": coin_data.get("links", {}).get("homepage", [None])[0],
-            "blockchain": coin_data.get("asset_platform_id"),
-            "smart_contract_address": coin_data.get("contract_address"),
-            "genesis_date": coin_data.get("genesis_date"),
-            "categories": coin_data.get("categories", []),
-            "platforms": coin_data.get("platforms", {}),
-            "links": {
-                "homepage": coin_data.get("links", {}).get("homepage", []),
-                "blockchain_site": coin_data.get("links", {}).get("blockchain_site", []),
-                "official_forum_url": coin_data.get("links", {}).get("official_forum_url", []),
-                "chat_url": coin_data.get("links", {}).get("chat_url", []),
-                "announcement_url": coin_data.get("links", {}).get("announcement_url", []),
-                "twitter_screen_name": coin_data.get("links", {}).get("twitter_screen_name"),
-                "facebook_username": coin_data.get("links", {}).get("facebook_username"),
-                "bitcointalk_thread_identifier": coin_data.get("links", {}).get("bitcointalk_thread_identifier"),
-                "telegram_channel_identifier": coin_data.get("links", {}).get("telegram_channel_identifier"),
-                "subreddit_url": coin_data.get("links", {}).get("subreddit_url"),
-                "repos_url": coin_data.get("links", {}).get("repos_url", {})
-            }
+async def _load_history_closes(db: AsyncSession, coin_id: str, interval: str, start: datetime, end: datetime, count: int) -> List[dict]:
+    """
+    Posledná cena v každom okne intervalu z OHLCV rollupu, najnovšie okná prvé
+
+    Bod okna je close (a close_ts) poslednej sviečky zdrojového rollupu
+    v okne, takže 30 dní po hodinách číta 720 riadkov namiesto všetkých
+    tickov. Rollupy neukladajú kapitalizáciu ani 24h zmenu, tie sú None.
+    """
+    seconds = int(HISTORY_INTERVALS[interval].total_seconds())
+    source = pick_ohlc_source(seconds)
+    source_seconds = schemas.OHLC_RESOLUTIONS[source]
+
+    ohlc = schemas.CoinPriceOHLC
+    query = select(ohlc.close_ts, ohlc.close, ohlc.volume).where(
+        ohlc.coin_id == coin_id,
+        ohlc.resolution == source,
+        # Rozsah primárneho kľúča: sviečky, ktoré sa prekrývajú s <start, end)
+        ohlc.bucket > start - timedelta(seconds=source_seconds),
+        ohlc.bucket < end,
+        ohlc.close_ts >= start,
+        ohlc.close_ts < end
+    )
+    if source_seconds == seconds:
+        query = query.order_by(ohlc.bucket.desc())
+    else:
+        bucket = func.date_bin(HISTORY_INTERVALS[interval], ohlc.bucket, HISTORY_BUCKET_ORIGIN)
+        query = query.distinct(bucket).order_by(bucket.desc(), ohlc.close_ts.desc())
+
+    return [
+        {
+            "ts": row.close_ts.isoformat(),
+            "usd": float(row.close),
+            "usd_market_cap": None,
+            "usd_24h_vol": float(row.volume) if row.volume is not None else None,
+            "usd_24h_change": None
         }
+        for row in await db.execute(query.limit(count))
+    ]
 
-        # Vytvoríme novú kryptomenu
-        db_coin = schemas.Coin(
-            coin_id=coin_id,
-            symbol=coin_data["symbol"],
-            name=coin_data["name"],
-            coin_metadata=metadata
-        )
-        db.add(db_coin)
-        db.commit()
-        db.refresh(db_coin)
-
-        # Vytvoríme záznam pre ceny kryptomeny
-        db_price = schemas.CoinPrice(
-            coin_id=coin_id,
-            usd=0,  # Predvolená hodnota, ktorá bude aktualizovaná
-            usd_market_cap=0,
-            usd_24h_vol=0,
-            usd_24h_change=0
-        )
-        db.add(db_price)
-        db.commit()
-
-        # Aktualizujeme ceny kryptomeny
-        update_coin_prices(db, [coin_id])
-
-        # Invalidate cache
-        redis_client.delete(f"coin:{coin_id}")
-        redis_client.delete("coins:*")
-
-        # Vrátime coin s konvertovanými metadátami
-        return models.Coin(
-            coin_id=db_coin.coin_id,
-            symbol=db_coin.symbol,
-            name=db_coin.name,
-            created_at=db_coin.created_at,
-            updated_at=db_coin.updated_at,
-            metadata=db_coin.coin_metadata if db_coin.coin_metadata else None
+def _bin_start(ts: datetime, seconds: int) -> datetime:
+    """
+    Začiatok okna dĺžky seconds, do ktorého patrí ts (rovnako ako date_bin s HISTORY_BUCKET_ORIGIN)
+    """
+    window = timedelta(seconds=seconds)
+    return HISTORY_BUCKET_ORIGIN + (ts - HISTORY_BUCKET_ORIGIN) // window * window
+
+def parse_resolution(resolution: str) -> int:
+    """
+    Prevedie rozlíšenie v tvare "15m", "4h", "1d" alebo "1w" na sekundy
+    """
+    match = re.fullmatch(r"(\d+)([mhdw])", resolution or "")
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Nepodporované rozlíšenie: {resolution}")
+    return int(match.group(1)) * OHLC_RESOLUTION_UNITS[match.group(2)]
+
+def pick_ohlc_source(seconds: int) -> str:
+    """
+    Vyberie najhrubší uložený rollup, z ktorého sa dá požadované rozlíšenie poskladať
+    """
+    candidates = [
+        (source_seconds, source)
+        for source, source_seconds in schemas.OHLC_RESOLUTIONS.items()
+        if seconds % source_seconds == 0
+    ]
+    if not candidates:
+        raise ValueError(f"Rozlíšenie {seconds}s sa nedá poskladať z uložených rollupov")
+    return max(candidates)[1]
+
+async def get_price_ohlc(
+    db: AsyncSession,
+    coin_id: str,
+    resolution: str = "1h",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 1000
+):
+    """
+    OHLCV sviečky jednej kryptomeny z predpočítaných rollupov
+
+    Ak požadované rozlíšenie nie je uložené priamo (napr. 15m alebo 4h),
+    sviečky sa poskladajú z najhrubšieho vhodného rollupu (5m, resp. 1h).
+    """
+    try:
+        seconds = parse_resolution(resolution)
+        source = pick_ohlc_source(seconds)
+
+        start, end = _time_range(start, end, timedelta(seconds=seconds * limit))
+        # Začiatok zarovnáme na okno rozlíšenia, inak by prvá poskladaná
+        # sviečka vznikla iba z časti zdrojových sviečok
+        start = _bin_start(start, seconds)
+
+        ohlc = schemas.CoinPriceOHLC
+        filters = (
+            ohlc.coin_id == coin_id,
+            ohlc.resolution == source,
+            ohlc.bucket >= start,
+            ohlc.bucket < end
         )
-    except Exception as e:
-        print(f"Chyba v create_coin: {e}")
+        if schemas.OHLC_RESOLUTIONS[source] == seconds:
+            query = (
+                select(ohlc.bucket, ohlc.open, ohlc.high, ohlc.low, ohlc.close, ohlc.volume)
+                .where(*filters)
+                .order_by(ohlc.bucket)
+                .limit(limit)
+            )
+        else:
+            bucket = func.date_bin(timedelta(seconds=seconds), ohlc.bucket, HISTORY_BUCKET_ORIGIN).label("bucket")
+            query = (
+                select(
+                    bucket,
+                    array_agg(aggregate_order_by(ohlc.open, ohlc.bucket))[1].label("open"),
+                    func.max(ohlc.high).label("high"),
+                    func.min(ohlc.low).label("low"),
+                    array_agg(aggregate_order_by(ohlc.close, ohlc.bucket.desc()))[1].label("close"),
+                    array_agg(aggregate_order_by(ohlc.volume, ohlc.bucket.desc()))[1].label("volume")
+                )
+                .where(*filters)
+                .group_by(bucket)
+                .order_by(bucket)
+                .limit(limit)
+            )
+        rows = (await db.execute(query)).all()
+
+        return {
+            "coin_id": coin_id,
+            "resolution": resolution,
+            "source_resolution": source,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "candles": [
+                {
+                    "bucket": row.bucket.isoformat(),
+                    "open": float(row.open),
+                    "high": float(row.high),
+                    "low": float(row.low),
+                    "close": float(row.close),
+                    "volume": float(row.volume) if row.volume is not None else None
+                }
+                for row in rows
+            ]
+        }
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v get_price_ohlc")
         raise
 
-def delete_coin(db: Session, coin_id: str):
+async def delete_coin(db: AsyncSession, coin_id: str):
     # Najprv skontrolujeme existenciu kryptomeny
-    db_coin = db.query(schemas.Coin).filter(schemas.Coin.coin_id == coin_id).first()
+    db_coin = await db.get(schemas.Coin, coin_id)
     if not db_coin:
         raise ValueError(f"Kryptomena s ID {coin_id} nebola nájdená")
     
     # Vymažeme všetky súvisiace záznamy
-    db.query(schemas.CoinPrice).filter(schemas.CoinPrice.coin_id == coin_id).delete()
-    db.query(schemas.CoinDetail).filter(schemas.CoinDetail.coin_id == coin_id).delete()
-    db.query(schemas.Coin).filter(schemas.Coin.coin_id == coin_id).delete()
+    await db.execute(delete(schemas.CoinPrice).where(schemas.CoinPrice.coin_id == coin_id))
+    await db.execute(delete(schemas.CoinPriceTick).where(schemas.CoinPriceTick.coin_id == coin_id))
+    await db.execute(delete(schemas.CoinPriceOHLC).where(schemas.CoinPriceOHLC.coin_id == coin_id))
+    await db.execute(delete(schemas.CoinMetadata).where(schemas.CoinMetadata.coin_id == coin_id))
+    await db.execute(delete(schemas.Coin).where(schemas.Coin.coin_id == coin_id))
     
-    db.commit()
+    await db.commit()
     
     # Invalidate cache
-    redis_client.delete(f"coin:{coin_id}")
-    redis_client.delete(f"price:{coin_id}")
-    redis_client.delete(f"details:{coin_id}")
-    redis_client.delete("coins:*")
+    await cache_delete("coin", f"{coin_id}:True", f"{coin_id}:False", f"{coin_id}:etag")
+    await cache_delete("price", coin_id)
+    await invalidate_cache("coins", "coins_prices", "count", "prices", "top", "analytics")
+    pipe = async_redis_client.pipeline(transaction=False)
+    for by in MARKET_RANK_FIELDS:
+        pipe.zrem(MARKET_RANK_KEY.format(by), coin_id)
+    # Po opätovnom pridaní sa cena musí zapísať aj keď sa na CoinGecko nezmenila
+    pipe.hdel(PRICE_SNAPSHOT_KEY, coin_id)
+    await pipe.execute()
     
     return True 
 
-def get_coin_prices(db: Session, coin_ids: List[str]):
+async def get_fx_rates(db: AsyncSession) -> dict:
     """
-    Získanie cien pre zoznam kryptomien
+    Výmenné kurzy voči USD (mena -> počet jednotiek za 1 USD) z cache alebo tabuľky fx_rates
     """
     try:
-        # Najprv aktualizujeme ceny pre existujúce záznamy
-        existing_prices = db.query(schemas.CoinPrice).filter(schemas.CoinPrice.coin_id.in_(coin_ids)).all()
-        existing_coin_ids = [price.coin_id for price in existing_prices]
-        
-        if existing_coin_ids:
-            update_coin_prices(db, existing_coin_ids)
-        
-        # Získame aktualizované ceny
-        prices = db.query(schemas.CoinPrice).filter(schemas.CoinPrice.coin_id.in_(coin_ids)).all()
-        
-        if prices:
-            try:
-                # Uložíme do cache na 10 sekúnd
-                prices_data = [price.to_dict() for price in prices]
-                cache_key = f"prices:{','.join(sorted(coin_ids))}"
-                redis_client.setex(
-                    cache_key,
-                    10,  # 10 sekúnd
-                    json.dumps(prices_data)
-                )
-            except Exception as e:
-                print(f"Chyba pri ukladaní do cache: {e}")
-        
-        return prices
-    except Exception as e:
-        print(f"Chyba v get_coin_prices: {e}")
+        async def load(session: AsyncSession):
+            rates = await session.execute(select(schemas.FxRate.currency, schemas.FxRate.rate))
+            return {currency: float(rate) for currency, rate in rates}
+
+        return await cached("fx", "rates", load, db)
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v get_fx_rates")
         raise
 
-def update_coin_prices(db: Session, coin_ids: List[str]):
+class UnsupportedCurrencyError(ValueError):
     """
-    Aktualizácia cien pre zoznam kryptomien z CoinGecko API
+    Požadovaná mena nie je v tabuľke výmenných kurzov
     """
-    try:
-        # Získame dáta z CoinGecko API
-        response = requests.get(
-            f"{settings.COINGECKO_API_URL}/simple/price",
-            params={
-                "ids": ",".join(coin_ids),
-                "vs_currencies": "usd",
-                "include_market_cap": "true",
-                "include_24hr_vol": "true",
-                "include_24hr_change": "true",
-                "include_last_updated_at": "true",
-                "precision": "4"  # Pridané pre presnosť na 4 desatinné miesta
+
+async def resolve_fx_rates(db: AsyncSession, currencies: List[str]) -> dict:
+    """
+    Kurzy požadovaných mien, neznáma mena vyhodí UnsupportedCurrencyError
+    """
+    rates = await get_fx_rates(db)
+    missing = [currency for currency in currencies if currency not in rates]
+    if missing:
+        raise UnsupportedCurrencyError(f"Nepodporované meny: {', '.join(missing)}")
+    return {currency: rates[currency] for currency in currencies}
+
+def _scale(value: Optional[float], rate: float) -> Optional[float]:
+    return value * rate if value is not None else None
+
+def convert_prices(prices: List[dict], rates: dict) -> List[dict]:
+    """
+    Doplní k cenám v USD prepočet do ďalších mien (pole quotes)
+
+    Prepočet prebieha v pamäti pre celú dávku naraz, bez požiadaviek
+    na CoinGecko. 24h zmena v percentách sa neprepočítava (je voči USD).
+    """
+    if not rates:
+        return prices
+    return [
+        {
+            **price_data,
+            "quotes": {
+                currency: {
+                    "price": _scale(price_data["usd"], rate),
+                    "market_cap": _scale(price_data["usd_market_cap"], rate),
+                    "volume_24h": _scale(price_data["usd_24h_vol"], rate)
+                }
+                for currency, rate in rates.items()
             }
-        )
+        }
+        for price_data in prices
+    ]
 
-        if response.status_code != 200:
-            raise ValueError(f"Chyba pri získavaní dát z CoinGecko API: {response.status_code}")
+async def get_coin_prices(db: AsyncSession, coin_ids: List[str], vs: Optional[List[str]] = None):
+    """
+    Získanie cien pre zoznam kryptomien
 
-        prices_data = response.json()
-        
-        # Aktualizujeme dáta v databáze
-        for coin_id, data in prices_data.items():
-            db_price = db.query(schemas.CoinPrice).filter(schemas.CoinPrice.coin_id == coin_id).first()
-            
-            if not db_price:
-                continue  # Preskočíme neexistujúce záznamy
-            
-            # Aktualizujeme hodnoty
-            db_price.usd = data.get("usd")
-            db_price.usd_market_cap = data.get("usd_market_cap")
-            db_price.usd_24h_vol = data.get("usd_24h_vol")
-            db_price.usd_24h_change = data.get("usd_24h_change")
-            db_price.last_updated_at = datetime.fromtimestamp(data.get("last_updated_at"))
-        
-        db.commit()
-        
-        # Invalidate cache
-        redis_client.delete(f"prices:{','.join(sorted(coin_ids))}")
-        
-        return True
-    except Exception as e:
-        print(f"Chyba v update_coin_prices: {e}")
+    Ceny sa čítajú iba z Redis cache alebo z tabuľky coin_prices. Jediným
+    zapisovateľom je background task update_prices_periodically. Meny vo
+    vs sa prepočítajú z USD podľa kurzov v tabuľke fx_rates.
+    """
+    try:
+        async def load(session: AsyncSession):
+            prices = await session.scalars(select(schemas.CoinPrice).where(schemas.CoinPrice.coin_id.in_(coin_ids)))
+            return [price.to_dict() for price in prices]
+
+        rates = await resolve_fx_rates(db, vs) if vs else {}
+        prices_data = await cached("prices", ",".join(sorted(coin_ids)), load, db)
+        return convert_prices([_with_age(price_data) for price_data in prices_data], rates)
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v get_coin_prices")
         raise
 
-def get_coin_price(db: Session, coin_id: str):
+async def get_coin_price(db: AsyncSession, coin_id: str, vs: Optional[List[str]] = None):
     """
     Získanie ceny pre jednu kryptomenu
+
+    Cena sa číta iba z Redis cache alebo z tabuľky coin_prices. Jediným
+    zapisovateľom je background task update_prices_periodically.
     """
     try:
-        # Najprv skontrolujeme existenciu záznamu
-        db_price = db.query(schemas.CoinPrice).filter(schemas.CoinPrice.coin_id == coin_id).first()
-        
-        if not db_price:
-            raise ValueError(f"Cena pre kryptomenu {coin_id} nebola nájdená")
-        
-        # Aktualizujeme cenu
-        update_coin_prices(db, [coin_id])
-        
-        # Získame aktualizovanú cenu
-        price = db.query(schemas.CoinPrice).filter(schemas.CoinPrice.coin_id == coin_id).first()
-        
-        if price:
-            try:
-                # Uložíme do cache na 10 sekúnd
-                price_data = price.to_dict()
-                cache_key = f"price:{coin_id}"
-                redis_client.setex(
-                    cache_key,
-                    10,  # 10 sekúnd
-                    json.dumps(price_data)
-                )
-            except Exception as e:
-                print(f"Chyba pri ukladaní do cache: {e}")
-        
-        return price
-    except Exception as e:
-        print(f"Chyba v get_coin_price: {e}")
+        async def load(session: AsyncSession):
+            price = await session.get(schemas.CoinPrice, coin_id)
+            
+            if not price:
+                raise ValueError(f"Cena pre kryptomenu {coin_id} nebola nájdená")
+            return price.to_dict()
+
+        rates = await resolve_fx_rates(db, vs) if vs else {}
+        return convert_prices([_with_age(await cached("price", coin_id, load, db))], rates)[0]
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v get_coin_price")
         raise
@@ -1,7 +1,10 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import get_settings
+from metrics import instrument_engine
 
 settings = get_settings()
 
@@ -14,14 +17,47 @@ if "postgresql" in DATABASE_URL:
         DATABASE_URL += "&"
     DATABASE_URL += "client_encoding=utf8&options=-c%20client_encoding=utf8"
 
+# Spoločné nastavenia poolu spojení pre sync aj async engine. Každý API
+# worker (a worker.py) má vlastný pool, celkový počet spojení je teda
+# (DB_POOL_SIZE + DB_MAX_OVERFLOW) * 2 enginy * počet procesov.
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING
+}
+
 engine = create_engine(
     DATABASE_URL,
     connect_args={
-        "options": "-c client_encoding=utf8"
-    }
+        "options": f"-c client_encoding=utf8 -c statement_timeout={settings.DB_STATEMENT_TIMEOUT}"
+    },
+    **POOL_OPTIONS
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Asynchrónny engine pre ingestion (asyncpg nepodporuje client_encoding v URL)
+ASYNC_DATABASE_URL = make_url(settings.DATABASE_URL)
+if ASYNC_DATABASE_URL.get_backend_name() == "postgresql":
+    ASYNC_DATABASE_URL = ASYNC_DATABASE_URL.set(drivername="postgresql+asyncpg")
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={
+        "server_settings": {
+            "client_encoding": "utf8",
+            "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT)
+        }
+    },
+    **POOL_OPTIONS
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Počty a trvanie SQL príkazov pre /metrics
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -29,4 +65,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
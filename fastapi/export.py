@@ -0,0 +1,236 @@
+from sqlalchemy import select, text
+from fastapi.responses import StreamingResponse
+import schemas
+from database import AsyncSessionLocal
+from serialization import dumps
+from config import settings
+from typing import AsyncIterator, List, Optional
+from datetime import datetime, timezone
+from decimal import Decimal
+import asyncio
+import csv
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Formát -> (media type, prípona súboru)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet")
+}
+
+# Dataset -> (tabuľka, stĺpce v poradí exportu, zoradenie)
+EXPORT_DATASETS = {
+    "current": (
+        schemas.CoinPrice,
+        ("coin_id", "usd", "usd_market_cap", "usd_24h_vol", "usd_24h_change", "last_updated_at"),
+        ("coin_id",)
+    ),
+    "history": (
+        schemas.CoinPriceTick,
+        ("coin_id", "ts", "usd", "usd_market_cap", "usd_24h_vol", "usd_24h_change"),
+        ("coin_id", "ts")
+    )
+}
+
+# Export drží databázové spojenie počas celého prenosu, súbežných exportov je preto málo
+_export_slots = asyncio.Semaphore(max(settings.EXPORT_MAX_CONCURRENT, 1))
+
+def _pyarrow():
+    """
+    Lenivý import pyarrow (import je pomalý a treba ho iba pre formáty arrow a parquet)
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Formáty arrow a parquet vyžadujú balík pyarrow (requirements.txt)")
+    return pyarrow
+
+def check_export(dataset: str, fmt: str):
+    """
+    Overí parametre exportu ešte pred odoslaním hlavičiek odpovede
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Nepodporovaný dataset: {dataset}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Nepodporovaný formát: {fmt}")
+    if fmt in ("arrow", "parquet"):
+        _pyarrow()
+
+async def try_acquire_slot() -> bool:
+    """
+    Obsadí slot exportu bez čakania, False ak sú všetky obsadené
+
+    Slot sa obsadzuje ešte v endpointe (pred odoslaním hlavičiek), aby
+    súbežné požiadavky nemohli obe prejsť kontrolou a jedna potom čakať
+    alebo zlyhať až počas streamu. Uvoľní ho ExportResponse.
+    """
+    if _export_slots.locked():
+        return False
+    # Semafor nie je obsadený, acquire sa vráti bez čakania (bez prepnutia na inú úlohu)
+    await _export_slots.acquire()
+    return True
+
+class ExportResponse(StreamingResponse):
+    """
+    Streamovaná odpoveď exportu, ktorá po skončení (aj po odpojení klienta) uvoľní slot
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _export_slots.release()
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Zapisovateľný súbor, ktorého obsah sa po každej dávke odošle klientovi
+
+    Pozícia (tell) rastie aj po vyprázdnení, Parquet podľa nej zapisuje
+    offsety do pätičky súboru.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+class _CsvEncoder:
+    def __init__(self, columns):
+        self.columns = columns
+
+    def start(self) -> bytes:
+        return self.encode([self.columns])
+
+    def encode(self, rows) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        return buffer.getvalue().encode()
+
+    def finish(self) -> bytes:
+        return b""
+
+class _NdjsonEncoder:
+    def __init__(self, columns):
+        self.columns = columns
+
+    def start(self) -> bytes:
+        return b""
+
+    def encode(self, rows) -> bytes:
+        return b"".join(dumps(dict(zip(self.columns, row))) + b"\n" for row in rows)
+
+    def finish(self) -> bytes:
+        return b""
+
+class _ArrowEncoder:
+    """
+    Arrow IPC stream alebo Parquet, každá dávka riadkov je jeden record batch / row group
+    """
+
+    def __init__(self, columns, parquet: bool = False):
+        self.pa = _pyarrow()
+        types = {"coin_id": self.pa.string(), "ts": self.pa.timestamp("us", tz="UTC"), "last_updated_at": self.pa.timestamp("us", tz="UTC")}
+        self.schema = self.pa.schema([(column, types.get(column, self.pa.float64())) for column in columns])
+        self.parquet = parquet
+        self.sink = _ChunkSink()
+        self.writer = None
+
+    def start(self) -> bytes:
+        if self.parquet:
+            self.writer = self.pa.parquet.ParquetWriter(self.sink, self.schema, compression="zstd")
+        else:
+            self.writer = self.pa.ipc.new_stream(self.sink, self.schema)
+        return self.sink.drain()
+
+    def encode(self, rows) -> bytes:
+        arrays = []
+        for i, field in enumerate(self.schema):
+            values = [row[i] for row in rows]
+            if self.pa.types.is_floating(field.type):
+                # Numeric stĺpce prichádzajú ako Decimal
+                values = [float(value) if isinstance(value, Decimal) else value for value in values]
+            arrays.append(self.pa.array(values, type=field.type))
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+def _encoder(fmt: str, columns):
+    if fmt == "csv":
+        return _CsvEncoder(columns)
+    if fmt == "ndjson":
+        return _NdjsonEncoder(columns)
+    return _ArrowEncoder(columns, parquet=fmt == "parquet")
+
+def _export_query(dataset: str, coin_ids: Optional[List[str]], start: Optional[datetime], end: Optional[datetime]):
+    table, columns, order = EXPORT_DATASETS[dataset]
+    query = select(*[getattr(table, column) for column in columns])
+    if coin_ids:
+        query = query.where(table.coin_id.in_(coin_ids))
+    if dataset == "history":
+        # Časy bez časovej zóny považujeme za UTC
+        if start is not None:
+            query = query.where(table.ts >= (start if start.tzinfo else start.replace(tzinfo=timezone.utc)))
+        if end is not None:
+            query = query.where(table.ts < (end if end.tzinfo else end.replace(tzinfo=timezone.utc)))
+    return query.order_by(*[getattr(table, column) for column in order])
+
+async def stream_prices(
+    dataset: str,
+    fmt: str,
+    coin_ids: Optional[List[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> AsyncIterator[bytes]:
+    """
+    Streamuje ceny po dávkach EXPORT_CHUNK_SIZE riadkov zo server-side kurzora
+
+    V pamäti je naraz iba jedna dávka, pamäť je teda nezávislá od veľkosti
+    tabuľky. Hlavička formátu sa odošle ešte pred dopytom, takže odpoveď
+    začne prichádzať okamžite. Session si generátor otvára sám, pretože
+    beží až po ukončení endpointu.
+    """
+    _, columns, _ = EXPORT_DATASETS[dataset]
+    encoder = _encoder(fmt, columns)
+    yield encoder.start()
+    async with AsyncSessionLocal() as db:
+        # Export trvá dlhšie ako bežný dopyt, DB_STATEMENT_TIMEOUT sa naň nevzťahuje
+        await db.execute(text("SET LOCAL statement_timeout = 0"))
+        result = await db.stream(
+            _export_query(dataset, coin_ids, start, end).execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+        )
+        exported = 0
+        async for rows in result.partitions():
+            exported += len(rows)
+            yield encoder.encode(rows)
+    yield encoder.finish()
+    logger.info(f"Export {dataset} ({fmt}) odoslal {exported} riadkov")
@@ -0,0 +1,764 @@
+from sqlalchemy import select, update, func, text, case, tuple_, inspect, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.schema import CreateIndex
+import schemas
+import models
+import coingecko
+from database import AsyncSessionLocal
+from redis_client import (
+    async_redis_client,
+    cache_delete,
+    invalidate_cache,
+    MARKET_RANK_KEY,
+    MARKET_RANK_FIELDS,
+    PRICE_UPDATES_CHANNEL,
+    PRICE_SNAPSHOT_KEY,
+    ONBOARDING_JOB_KEY,
+    ONBOARDING_JOB_TTL
+)
+from config import settings
+from serialization import dumps, content_hash
+from typing import List, Optional, Tuple
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+import asyncio
+import json
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Počet riadkov v jednom INSERT ... ON CONFLICT príkaze (limit parametrov PostgreSQL je 32767)
+UPSERT_CHUNK_SIZE = 1000
+
+# Mesačné partície coin_price_ticks, o ktorých vieme, že existujú
+_tick_partitions = set()
+
+# Bežiace úlohy hromadného pridania kryptomien (v rámci procesu)
+_onboarding_tasks = set()
+
+# Koľkokrát sa pri hromadnom pridaní opakuje sťahovanie po odpovedi 429
+ONBOARDING_RATE_LIMIT_RETRIES = 3
+
+# Polia ceny, ktorých zmena znamená zápis, invalidáciu cache a publikovanie klientom
+PRICE_UPDATE_FIELDS = ("usd", "usd_market_cap", "usd_24h_vol", "usd_24h_change", "last_updated_at")
+
+def extract_metadata(coin_data: dict) -> dict:
+    """
+    Extrahuje relevantné metadáta z odpovede /coins/{id}
+    """
+    links = coin_data.get("links", {})
+    return {
+        "description": coin_data.get("description", {}).get("en"),
+        "website_url": links.get("homepage", [None])[0],
+        "blockchain": coin_data.get("asset_platform_id"),
+        "smart_contract_address": coin_data.get("contract_address"),
+        "genesis_date": coin_data.get("genesis_date"),
+        "categories": coin_data.get("categories", []),
+        "platforms": coin_data.get("platforms", {}),
+        "links": {
+            "homepage": links.get("homepage", []),
+            "blockchain_site": links.get("blockchain_site", []),
+            "official_forum_url": links.get("official_forum_url", []),
+            "chat_url": links.get("chat_url", []),
+            "announcement_url": links.get("announcement_url", []),
+            "twitter_screen_name": links.get("twitter_screen_name"),
+            "facebook_username": links.get("facebook_username"),
+            "bitcointalk_thread_identifier": links.get("bitcointalk_thread_identifier"),
+            "telegram_channel_identifier": links.get("telegram_channel_identifier"),
+            "subreddit_url": links.get("subreddit_url"),
+            "repos_url": links.get("repos_url", {})
+        }
+    }
+
+async def upsert_coin_metadata(db: AsyncSession, metadata: dict) -> List[str]:
+    """
+    Zapíše metadáta kryptomien (coin_id -> dáta) do tabuľky coin_metadata
+
+    Dáta, content_hash a updated_at sa prepíšu iba ak sa hash zmenil,
+    veľký JSONB stĺpec sa tak pri nezmenených metadátach neprepisuje.
+    checked_at sa posunie vždy. Transakciu commitne volajúci.
+
+    Returns:
+        ID kryptomien, ktorých metadáta sú nové alebo zmenené
+    """
+    rows = [
+        {"coin_id": coin_id, "data": data, "content_hash": content_hash(data)}
+        for coin_id, data in metadata.items()
+    ]
+    changed = []
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = pg_insert(schemas.CoinMetadata).values(rows[i:i + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[schemas.CoinMetadata.coin_id],
+            set_={
+                "data": stmt.excluded.data,
+                "content_hash": stmt.excluded.content_hash,
+                "updated_at": func.now(),
+                "checked_at": func.now()
+            },
+            where=schemas.CoinMetadata.content_hash.is_distinct_from(stmt.excluded.content_hash)
+        ).returning(schemas.CoinMetadata.coin_id)
+        changed.extend(await db.scalars(stmt))
+
+    changed_ids = set(changed)
+    unchanged = [row["coin_id"] for row in rows if row["coin_id"] not in changed_ids]
+    for i in range(0, len(unchanged), UPSERT_CHUNK_SIZE):
+        await db.execute(
+            update(schemas.CoinMetadata)
+            .where(schemas.CoinMetadata.coin_id.in_(unchanged[i:i + UPSERT_CHUNK_SIZE]))
+            .values(checked_at=func.now())
+        )
+    return changed
+
+async def invalidate_coin_metadata(coin_ids: List[str]):
+    """
+    Zmaže z cache detaily kryptomien so zmenenými metadátami
+    """
+    if not coin_ids:
+        return
+    await cache_delete("coin", *[key for coin_id in coin_ids for key in (f"{coin_id}:True", f"{coin_id}:etag")])
+    await invalidate_cache("coins", "coins_prices")
+
+async def refresh_coin_metadata(db: AsyncSession, limit: int) -> dict:
+    """
+    Obnoví metadáta najviac limit kryptomien, ktoré sú staršie ako METADATA_REFRESH_INTERVAL
+
+    Prednosť majú kryptomeny bez metadát a tie, ktoré boli stiahnuté
+    najdávnejšie. Kryptomeny sa sťahujú postupne cez coingecko.fetch_coin,
+    ktorý čerpá zo spoločného rozpočtu požiadaviek.
+    """
+    threshold = datetime.now(timezone.utc) - timedelta(seconds=settings.METADATA_REFRESH_INTERVAL)
+    query = (
+        select(schemas.Coin.coin_id)
+        .outerjoin(schemas.CoinMetadata, schemas.CoinMetadata.coin_id == schemas.Coin.coin_id)
+        .where(or_(schemas.CoinMetadata.checked_at.is_(None), schemas.CoinMetadata.checked_at < threshold))
+        .order_by(schemas.CoinMetadata.checked_at.asc().nulls_first())
+        .limit(limit)
+    )
+    coin_ids = list(await db.scalars(query))
+
+    metadata = {}
+    failed = 0
+    for coin_id in coin_ids:
+        try:
+            metadata[coin_id] = extract_metadata(await coingecko.fetch_coin(coin_id))
+        except coingecko.RateLimitError:
+            # Rozpočet patrí prednostne cenám, zvyšok počká na ďalší cyklus
+            break
+        except Exception as e:
+            failed += 1
+            logger.warning(f"Metadáta kryptomeny {coin_id} sa nepodarilo stiahnuť: {str(e)}")
+
+    changed = await upsert_coin_metadata(db, metadata) if metadata else []
+    await db.commit()
+    await invalidate_coin_metadata(changed)
+    return {"checked": len(metadata), "changed": len(changed), "failed": failed}
+
+async def refresh_fx_rates(db: AsyncSession) -> int:
+    """
+    Obnoví výmenné kurzy voči USD z CoinGecko /exchange_rates
+
+    CoinGecko vracia hodnoty voči 1 BTC, kurz meny voči USD je preto
+    value(mena) / value(usd).
+
+    Returns:
+        Počet uložených mien
+    """
+    rates = await coingecko.fetch_exchange_rates()
+    usd = rates.get("usd", {}).get("value")
+    if not usd:
+        raise ValueError("Odpoveď /exchange_rates neobsahuje kurz USD")
+
+    rows = [
+        {
+            "currency": currency,
+            "name": data.get("name") or currency,
+            "unit": data.get("unit"),
+            "type": data.get("type"),
+            "rate": Decimal(str(data["value"])) / Decimal(str(usd))
+        }
+        for currency, data in rates.items()
+        if data.get("value") is not None
+    ]
+    stmt = pg_insert(schemas.FxRate).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[schemas.FxRate.currency],
+        set_={
+            "name": stmt.excluded.name,
+            "unit": stmt.excluded.unit,
+            "type": stmt.excluded.type,
+            "rate": stmt.excluded.rate,
+            "updated_at": func.now()
+        }
+    )
+    await db.execute(stmt)
+    await db.commit()
+    await invalidate_cache("fx")
+    return len(rows)
+
+def migrate_legacy_metadata(engine):
+    """
+    Presunie metadáta zo starého stĺpca coins.coin_metadata do tabuľky coin_metadata
+
+    Spúšťa sa pri štarte po create_all. Presunuté metadáta majú checked_at
+    NULL, takže ich obnova na pozadí stiahne ako prvé. Advisory zámok
+    zabráni súbežnej migrácii z viacerých procesov.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('migrate_coin_metadata'))"))
+        columns = {column["name"] for column in inspect(conn).get_columns("coins")}
+        if "coin_metadata" not in columns:
+            return
+
+        rows = [
+            {"coin_id": coin_id, "data": data, "content_hash": content_hash(data), "checked_at": None}
+            for coin_id, data in conn.execute(text("SELECT coin_id, coin_metadata FROM coins WHERE coin_metadata IS NOT NULL"))
+        ]
+        for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            conn.execute(pg_insert(schemas.CoinMetadata).values(rows[i:i + UPSERT_CHUNK_SIZE]).on_conflict_do_nothing())
+        conn.execute(text("ALTER TABLE coins DROP COLUMN coin_metadata"))
+        logger.info(f"Metadáta {len(rows)} kryptomien boli presunuté do tabuľky coin_metadata")
+
+def ensure_indexes(engine):
+    """
+    Vytvorí indexy zo schemas, ktoré v existujúcich tabuľkách chýbajú (CREATE INDEX IF NOT EXISTS)
+
+    create_all pridá indexy iba pri vytvorení tabuľky, takže index pridaný
+    neskôr (napr. ix_coin_prices_market_cap_coin_id) by v staršej databáze
+    nevznikol. Spúšťa sa pri štarte po create_all, advisory zámok zabráni
+    súbežnému vytváraniu z viacerých procesov.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('ensure_indexes'))"))
+        for table in schemas.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+async def fetch_prices_batched(coin_ids: List[str]) -> Tuple[dict, List[str]]:
+    """
+    Získa ceny po dávkach veľkosti PRICE_BATCH_SIZE so súbežnosťou
+    obmedzenou na PRICE_FETCH_CONCURRENCY a výsledky zlúči.
+
+    Chyba jednej dávky neukončí celý cyklus, dávka sa iba preskočí.
+    Výnimka sa vyhodí len ak zlyhajú všetky dávky.
+
+    Returns:
+        Zlúčené ceny a ID kryptomien z dávok, na ktoré CoinGecko odpovedalo
+    """
+    batch_size = max(settings.PRICE_BATCH_SIZE, 1)
+    batches = [coin_ids[i:i + batch_size] for i in range(0, len(coin_ids), batch_size)]
+    semaphore = asyncio.Semaphore(max(settings.PRICE_FETCH_CONCURRENCY, 1))
+
+    async def fetch_batch(batch: List[str]) -> dict:
+        async with semaphore:
+            return await coingecko.fetch_simple_prices(batch)
+
+    results = await asyncio.gather(*(fetch_batch(batch) for batch in batches), return_exceptions=True)
+
+    prices_data = {}
+    fetched = []
+    failed_batches = 0
+    for batch, result in zip(batches, results):
+        if isinstance(result, BaseException):
+            failed_batches += 1
+            logger.warning(f"Dávka {batch[0]}..{batch[-1]} ({len(batch)} kryptomien) zlyhala: {result}")
+            continue
+        prices_data.update(result)
+        fetched.extend(batch)
+
+    if batches and failed_batches == len(batches):
+        # Pri prekročenom limite necháme volajúceho počkať podľa Retry-After
+        for result in results:
+            if isinstance(result, coingecko.RateLimitError):
+                raise result
+        raise ValueError(f"Všetkých {failed_batches} dávok z CoinGecko API zlyhalo")
+
+    return prices_data, fetched
+
+def _price_rows(prices_data: dict) -> List[dict]:
+    """
+    Prevedie odpoveď /simple/price na riadky tabuľky coin_prices
+    """
+    now = datetime.now(timezone.utc)
+    rows = []
+    for coin_id, data in prices_data.items():
+        if data.get("usd") is None:
+            continue  # Bez ceny v USD nemáme čo uložiť
+        rows.append({
+            "coin_id": coin_id,
+            "usd": data.get("usd"),
+            "usd_market_cap": data.get("usd_market_cap"),
+            "usd_24h_vol": data.get("usd_24h_vol"),
+            "usd_24h_change": data.get("usd_24h_change"),
+            "last_updated_at": datetime.fromtimestamp(data["last_updated_at"], tz=timezone.utc) if data.get("last_updated_at") else now
+        })
+    return rows
+
+async def upsert_coin_prices(db: AsyncSession, rows: List[dict]) -> int:
+    """
+    Hromadne zapíše ceny cez INSERT ... ON CONFLICT DO UPDATE
+
+    Namiesto SELECT + UPDATE pre každú kryptomenu sa odošle jeden príkaz
+    na UPSERT_CHUNK_SIZE riadkov. Transakciu commitne volajúci.
+    """
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = pg_insert(schemas.CoinPrice).values(rows[i:i + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[schemas.CoinPrice.coin_id],
+            set_={
+                "usd": stmt.excluded.usd,
+                "usd_market_cap": stmt.excluded.usd_market_cap,
+                "usd_24h_vol": stmt.excluded.usd_24h_vol,
+                "usd_24h_change": stmt.excluded.usd_24h_change,
+                "last_updated_at": stmt.excluded.last_updated_at,
+                "updated_at": func.now()
+            },
+            # Nezmenený riadok sa neprepíše (poistka pre prípad straty snapshotu v Redis)
+            where=tuple_(*[getattr(schemas.CoinPrice, field) for field in PRICE_UPDATE_FIELDS]).is_distinct_from(
+                tuple_(*[getattr(stmt.excluded, field) for field in PRICE_UPDATE_FIELDS])
+            )
+        )
+        await db.execute(stmt)
+    return len(rows)
+
+def _month_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, 1, tzinfo=timezone.utc)
+
+def _next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+async def ensure_tick_partitions(db: AsyncSession, timestamps: List[datetime]):
+    """
+    Vytvorí mesačné partície coin_price_ticks pre dané časy (a nasledujúci mesiac)
+    """
+    months = {_month_start(ts.astimezone(timezone.utc)) for ts in timestamps}
+    months |= {_next_month(month) for month in months}
+    for month in sorted(months - _tick_partitions):
+        partition = f"{schemas.CoinPriceTick.__tablename__}_y{month.year}m{month.month:02d}"
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {schemas.CoinPriceTick.__tablename__} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        ))
+        _tick_partitions.add(month)
+
+async def insert_price_ticks(db: AsyncSession, rows: List[dict]) -> int:
+    """
+    Hromadne pripíše riadky do histórie cien (coin_price_ticks)
+
+    Ako čas ticku sa používa last_updated_at z CoinGecko, takže opakovane
+    stiahnutá nezmenená cena sa vďaka ON CONFLICT DO NOTHING nezapíše dvakrát.
+    """
+    ticks = [
+        {
+            "coin_id": row["coin_id"],
+            "ts": row["last_updated_at"],
+            "usd": row["usd"],
+            "usd_market_cap": row["usd_market_cap"],
+            "usd_24h_vol": row["usd_24h_vol"],
+            "usd_24h_change": row["usd_24h_change"]
+        }
+        for row in rows
+    ]
+    if not ticks:
+        return 0
+
+    await ensure_tick_partitions(db, [tick["ts"] for tick in ticks])
+    for i in range(0, len(ticks), UPSERT_CHUNK_SIZE):
+        stmt = pg_insert(schemas.CoinPriceTick).values(ticks[i:i + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_nothing(index_elements=[schemas.CoinPriceTick.coin_id, schemas.CoinPriceTick.ts])
+        await db.execute(stmt)
+    return len(ticks)
+
+async def update_ohlc(db: AsyncSession, rows: List[dict]) -> int:
+    """
+    Inkrementálne zapracuje nové ceny do OHLCV rollupov všetkých rozlíšení
+
+    Pre každú kryptomenu a rozlíšenie sa sviečka okna vytvorí alebo upraví
+    jedným INSERT ... ON CONFLICT: high/low cez GREATEST/LEAST, open a close
+    podľa času ticku, takže aj opakované alebo oneskorené ticky dajú
+    správny výsledok.
+    """
+    candles = []
+    for row in rows:
+        ts = row["last_updated_at"]
+        epoch = int(ts.timestamp())
+        for resolution, seconds in schemas.OHLC_RESOLUTIONS.items():
+            candles.append({
+                "coin_id": row["coin_id"],
+                "resolution": resolution,
+                "bucket": datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc),
+                "open": row["usd"],
+                "high": row["usd"],
+                "low": row["usd"],
+                "close": row["usd"],
+                "volume": row["usd_24h_vol"],
+                "open_ts": ts,
+                "close_ts": ts
+            })
+
+    ohlc = schemas.CoinPriceOHLC.__table__
+    for i in range(0, len(candles), UPSERT_CHUNK_SIZE):
+        stmt = pg_insert(schemas.CoinPriceOHLC).values(candles[i:i + UPSERT_CHUNK_SIZE])
+        is_earlier = stmt.excluded.open_ts < ohlc.c.open_ts
+        is_later = stmt.excluded.close_ts >= ohlc.c.close_ts
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ohlc.c.coin_id, ohlc.c.resolution, ohlc.c.bucket],
+            set_={
+                "open": case((is_earlier, stmt.excluded.open), else_=ohlc.c.open),
+                "open_ts": func.least(ohlc.c.open_ts, stmt.excluded.open_ts),
+                "high": func.greatest(ohlc.c.high, stmt.excluded.high),
+                "low": func.least(ohlc.c.low, stmt.excluded.low),
+                "close": case((is_later, stmt.excluded.close), else_=ohlc.c.close),
+                "volume": case((is_later, stmt.excluded.volume), else_=ohlc.c.volume),
+                "close_ts": func.greatest(ohlc.c.close_ts, stmt.excluded.close_ts)
+            }
+        )
+        await db.execute(stmt)
+    return len(candles)
+
+async def update_rankings(prices_data: dict):
+    """
+    Inkrementálne aktualizuje rebríčky (ZSET) podľa kapitalizácie, objemu a zmeny
+
+    ZADD prepíše skóre iba pre kryptomeny v dávke, takže /market/top
+    vie vrátiť top N cez ZREVRANGE v O(log n + N) bez triedenia.
+    """
+    pipe = async_redis_client.pipeline(transaction=False)
+    for by, field in MARKET_RANK_FIELDS.items():
+        scores = {
+            coin_id: float(data[field])
+            for coin_id, data in prices_data.items()
+            if data.get(field) is not None
+        }
+        if scores:
+            pipe.zadd(MARKET_RANK_KEY.format(by), scores)
+    await pipe.execute()
+
+def _snapshot_value(row: dict) -> str:
+    return json.dumps([
+        row[field].timestamp() if isinstance(row[field], datetime) else row[field]
+        for field in PRICE_UPDATE_FIELDS
+    ])
+
+async def detect_changed_prices(rows: List[dict]) -> List[dict]:
+    """
+    Vráti iba riadky, ktorých hodnoty alebo last_updated_at sa líšia od
+    snapshotu posledných zapísaných cien v Redis (PRICE_SNAPSHOT_KEY)
+
+    Snapshot je zdieľaný všetkými procesmi a prežije reštart, takže ani
+    prvý cyklus po štarte neprepisuje nezmenené ceny.
+    """
+    changed = []
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[i:i + UPSERT_CHUNK_SIZE]
+        previous = await async_redis_client.hmget(PRICE_SNAPSHOT_KEY, [row["coin_id"] for row in chunk])
+        changed.extend(row for row, value in zip(chunk, previous) if value != _snapshot_value(row))
+    return changed
+
+async def save_price_snapshot(rows: List[dict]):
+    """
+    Zapíše zmenené ceny do snapshotu (volať až po commite transakcie)
+    """
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[i:i + UPSERT_CHUNK_SIZE]
+        await async_redis_client.hset(PRICE_SNAPSHOT_KEY, mapping={row["coin_id"]: _snapshot_value(row) for row in chunk})
+
+async def publish_price_updates(rows: List[dict]) -> int:
+    """
+    Publikuje zmenené ceny na PRICE_UPDATES_CHANNEL
+
+    Správy sú JSON zoznamy najviac UPSERT_CHUNK_SIZE cien, každý API
+    worker ich rozošle svojim pripojeným klientom (modul streaming).
+    """
+    if not rows:
+        return 0
+
+    updates = [
+        {
+            "coin_id": row["coin_id"],
+            **{field: row[field] for field in PRICE_UPDATE_FIELDS},
+            "last_updated_at": row["last_updated_at"].isoformat()
+        }
+        for row in rows
+    ]
+    pipe = async_redis_client.pipeline(transaction=False)
+    for i in range(0, len(updates), UPSERT_CHUNK_SIZE):
+        pipe.publish(PRICE_UPDATES_CHANNEL, dumps(updates[i:i + UPSERT_CHUNK_SIZE]))
+    await pipe.execute()
+    return len(updates)
+
+async def update_coin_prices(db: AsyncSession, coin_ids: List[str], force: bool = False) -> dict:
+    """
+    Aktualizácia cien pre zoznam kryptomien z CoinGecko API
+
+    Zapisujú, invalidujú a publikujú sa iba ceny, ktoré sa od posledného
+    zápisu zmenili. Ak sa nezmenila žiadna, cyklus nič nezapíše.
+
+    Args:
+        force: Zapísať všetky stiahnuté ceny bez ohľadu na snapshot
+
+    Returns:
+        Počty zmenených, nezmenených a chýbajúcich (bez ceny) kryptomien
+        a v "refreshed" ID kryptomien, pre ktoré CoinGecko odpovedalo
+        (bez tých zo zlyhaných dávok)
+    """
+    try:
+        prices_data, fetched = await fetch_prices_batched(coin_ids)
+        rows = _price_rows(prices_data)
+        changed = rows if force else await detect_changed_prices(rows)
+        stats = {
+            "changed": len(changed),
+            "unchanged": len(rows) - len(changed),
+            "missing": len(fetched) - len(rows),
+            "failed": len(coin_ids) - len(fetched),
+            "refreshed": fetched
+        }
+        if not changed:
+            return stats
+
+        await upsert_coin_prices(db, changed)
+        await insert_price_ticks(db, changed)
+        await update_ohlc(db, changed)
+        await db.commit()
+        await save_price_snapshot(changed)
+        await update_rankings({row["coin_id"]: prices_data[row["coin_id"]] for row in changed})
+
+        # Ceny jednotlivých kryptomien zmažeme po kľúčoch, celé rodiny zneplatníme
+        # iba tam, kde sa nedá zistiť, ktoré záznamy zmenené kryptomeny obsahujú
+        # (zoznamy cien, rebríčky a stránky s cenami alebo zoradené podľa market_cap)
+        await cache_delete("price", *[row["coin_id"] for row in changed])
+        await invalidate_cache("prices", "top", "coins_prices")
+
+        # Klientom streamingu pošleme iba zmenené ceny
+        await publish_price_updates(changed)
+
+        return stats
+    except Exception:
+        # Partície vytvorené v zrušenej transakcii neexistujú, pri ďalšom cykle ich overíme znova
+        _tick_partitions.clear()
+        logger.exception("Chyba v update_coin_prices")
+        raise
+
+def _invalid_coin(coin_data: dict) -> Optional[str]:
+    """
+    Dôvod, prečo sa kryptomena nedá uložiť do tabuľky coins (None ak sa dá)
+    """
+    for field in ("symbol", "name"):
+        value = coin_data.get(field)
+        max_length = schemas.Coin.__table__.c[field].type.length
+        if not value:
+            return f"Chýba pole {field}"
+        if len(value) > max_length:
+            return f"Pole {field} je dlhšie ako {max_length} znakov"
+    return None
+
+async def create_coin(db: AsyncSession, coin_id: str):
+    try:
+        # Najprv skontrolujeme či kryptomena už existuje
+        existing_coin = await db.get(schemas.Coin, coin_id, options=[selectinload(schemas.Coin.metadata_entry)])
+        if existing_coin:
+            # Ak kryptomena existuje, aktualizujeme jej ceny
+            await update_coin_prices(db, [coin_id])
+            return models.Coin(
+                coin_id=existing_coin.coin_id,
+                symbol=existing_coin.symbol,
+                name=existing_coin.name,
+                created_at=existing_coin.created_at,
+                updated_at=existing_coin.updated_at,
+                metadata=existing_coin.metadata_entry.data if existing_coin.metadata_entry else None
+            )
+
+        # Overenie existencie kryptomeny cez CoinGecko API
+        coin_data = await coingecko.fetch_coin(coin_id)
+        error = _invalid_coin(coin_data)
+        if error is not None:
+            raise ValueError(f"Kryptomenu {coin_id} nie je možné uložiť: {error}")
+
+        # Vytvoríme novú kryptomenu
+        metadata = extract_metadata(coin_data)
+        db_coin = schemas.Coin(
+            coin_id=coin_id,
+            symbol=coin_data["symbol"],
+            name=coin_data["name"]
+        )
+        db.add(db_coin)
+        # Riadok coins musí existovať pred vložením metadát (cudzí kľúč)
+        await db.flush()
+        await upsert_coin_metadata(db, {coin_id: metadata})
+        await db.commit()
+        await db.refresh(db_coin)
+
+        # Riadok coin_prices vznikne až so skutočnou cenou (zapíšeme ju vždy, aj keď je v snapshote)
+        await update_coin_prices(db, [coin_id], force=True)
+
+        # Invalidate cache
+        await invalidate_cache("coins", "coins_prices", "count")
+
+        # Vrátime coin s konvertovanými metadátami
+        return models.Coin(
+            coin_id=db_coin.coin_id,
+            symbol=db_coin.symbol,
+            name=db_coin.name,
+            created_at=db_coin.created_at,
+            updated_at=db_coin.updated_at,
+            metadata=metadata if metadata else None
+        )
+    except ValueError:
+        raise
+    except Exception:
+        logger.exception("Chyba v create_coin")
+        raise
+
+def _job_key(job_id: str) -> str:
+    return ONBOARDING_JOB_KEY.format(job_id)
+
+async def start_onboarding(coin_ids: List[str]) -> dict:
+    """
+    Založí úlohu hromadného pridania kryptomien a spustí ju na pozadí
+
+    Priebeh sa ukladá do Redis hashu, takže ho vie prečítať ktorýkoľvek
+    API worker (get_onboarding_job).
+    """
+    job_id = uuid.uuid4().hex
+    coin_ids = list(dict.fromkeys(coin_id.strip() for coin_id in coin_ids if coin_id.strip()))
+    job = {
+        "job_id": job_id,
+        "status": "pending",
+        "total": len(coin_ids),
+        "skipped": 0,
+        "fetched": 0,
+        "failed": 0,
+        "created": 0,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": ""
+    }
+    pipe = async_redis_client.pipeline(transaction=True)
+    pipe.hset(_job_key(job_id), mapping=job)
+    pipe.expire(_job_key(job_id), ONBOARDING_JOB_TTL)
+    await pipe.execute()
+
+    task = asyncio.create_task(onboard_coins(job_id, coin_ids))
+    # Referenciu držíme, kým úloha nedobehne (inak by ju mohol zmazať GC)
+    _onboarding_tasks.add(task)
+    task.add_done_callback(_onboarding_tasks.discard)
+    return await get_onboarding_job(job_id)
+
+async def get_onboarding_job(job_id: str) -> dict:
+    """
+    Aktuálny stav úlohy hromadného pridania kryptomien
+    """
+    job = await async_redis_client.hgetall(_job_key(job_id))
+    if not job:
+        raise ValueError(f"Úloha {job_id} nebola nájdená")
+    for field in ("total", "skipped", "fetched", "failed", "created"):
+        job[field] = int(job[field])
+    job["errors"] = json.loads(job["errors"]) if job.get("errors") else {}
+    job["finished_at"] = job["finished_at"] or None
+    return job
+
+async def onboard_coins(job_id: str, coin_ids: List[str]):
+    """
+    Hromadne pridá kryptomeny
+
+    1. Jedným IN dopytom vynechá kryptomeny, ktoré už existujú.
+    2. Metadáta stiahne súbežne (najviac ONBOARDING_CONCURRENCY naraz,
+       v rámci rozpočtu požiadaviek na CoinGecko). Kryptomeny, ktoré sa
+       nedajú uložiť (napr. príliš dlhý symbol), sa počítajú ako failed.
+    3. Riadky coins a coin_metadata vloží v jednej transakcii.
+    4. Ceny všetkých nových kryptomien stiahne jedným dávkovým cyklom,
+       riadok coin_prices vznikne až so skutočnou cenou.
+    """
+    key = _job_key(job_id)
+    errors = {}
+    try:
+        await async_redis_client.hset(key, "status", "running")
+        async with AsyncSessionLocal() as db:
+            existing = set(await db.scalars(
+                select(schemas.Coin.coin_id).where(schemas.Coin.coin_id.in_(coin_ids))
+            ))
+            new_ids = [coin_id for coin_id in coin_ids if coin_id not in existing]
+            await async_redis_client.hset(key, "skipped", len(existing))
+
+            semaphore = asyncio.Semaphore(max(settings.ONBOARDING_CONCURRENCY, 1))
+
+            async def fetch(coin_id: str):
+                async with semaphore:
+                    for attempt in range(ONBOARDING_RATE_LIMIT_RETRIES + 1):
+                        try:
+                            coin_data = await coingecko.fetch_coin(coin_id)
+                            error = _invalid_coin(coin_data)
+                            if error is None:
+                                await async_redis_client.hincrby(key, "fetched", 1)
+                                return coin_data
+                            break
+                        except coingecko.RateLimitError as e:
+                            # Rozpočet je pozastavený, ďalší pokus počká v rate_limiter
+                            error = e
+                        except Exception as e:
+                            error = e
+                            break
+                    errors[coin_id] = str(error)
+                    await async_redis_client.hincrby(key, "failed", 1)
+                    return None
+
+            results = await asyncio.gather(*(fetch(coin_id) for coin_id in new_ids))
+            metadata = {
+                coin_id: extract_metadata(coin_data)
+                for coin_id, coin_data in zip(new_ids, results)
+                if coin_data is not None
+            }
+            coins = [
+                {
+                    "coin_id": coin_id,
+                    "symbol": coin_data["symbol"],
+                    "name": coin_data["name"]
+                }
+                for coin_id, coin_data in zip(new_ids, results)
+                if coin_data is not None
+            ]
+
+            if coins:
+                for i in range(0, len(coins), UPSERT_CHUNK_SIZE):
+                    await db.execute(
+                        pg_insert(schemas.Coin).values(coins[i:i + UPSERT_CHUNK_SIZE]).on_conflict_do_nothing()
+                    )
+                await upsert_coin_metadata(db, metadata)
+                await db.commit()
+                await async_redis_client.hset(key, "created", len(coins))
+                await invalidate_cache("coins", "coins_prices", "count")
+
+                await async_redis_client.hset(key, "status", "refreshing_prices")
+                await update_coin_prices(db, [coin["coin_id"] for coin in coins], force=True)
+
+        status = "done"
+    except asyncio.CancelledError:
+        # Proces sa vypína (stop_onboarding), úloha by inak ostala "running"
+        logger.warning(f"Úloha pridania kryptomien {job_id} bola prerušená")
+        errors["_job"] = "Úloha bola prerušená vypnutím procesu"
+        await _finish_onboarding_job(key, "failed", errors)
+        raise
+    except Exception as e:
+        logger.error(f"Chyba v úlohe pridania kryptomien {job_id}: {str(e)}")
+        errors["_job"] = str(e)
+        status = "failed"
+
+    await _finish_onboarding_job(key, status, errors)
+
+async def _finish_onboarding_job(key: str, status: str, errors: dict):
+    await async_redis_client.hset(key, mapping={
+        "status": status,
+        "errors": json.dumps(errors),
+        "finished_at": datetime.now(timezone.utc).isoformat()
+    })
+
+async def stop_onboarding():
+    """
+    Zruší bežiace úlohy hromadného pridania (pri vypnutí procesu) a označí ich ako failed
+    """
+    tasks = list(_onboarding_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
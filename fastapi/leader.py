@@ -0,0 +1,108 @@
+from redis_client import async_redis_client
+import asyncio
+import logging
+import socket
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Obnoví platnosť zámku iba ak ho stále drží tento proces
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Uvoľní zámok iba ak ho stále drží tento proces
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class LeaderLease:
+    """
+    Prenájom (lease) vodcovstva cez Redis zámok s obnovou
+
+    Vodcom je proces, ktorému sa podarí SET NX PX na kľúč. Vodca obnovuje
+    platnosť každú tretinu TTL, ak obnova zlyhá alebo sa nepodarí do TTL,
+    vodcovstvo stráca. Po páde vodcu prevezme úlohu iný proces najneskôr
+    po ttl + retry_interval sekundách.
+    """
+
+    def __init__(self, key: str, ttl: float):
+        self.key = key
+        self.ttl = ttl
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self._renew = async_redis_client.register_script(_RENEW_SCRIPT)
+        self._release = async_redis_client.register_script(_RELEASE_SCRIPT)
+
+    @property
+    def renew_interval(self) -> float:
+        return self.ttl / 3
+
+    async def acquire(self) -> bool:
+        return bool(await async_redis_client.set(self.key, self.token, nx=True, px=int(self.ttl * 1000)))
+
+    async def renew(self) -> bool:
+        return bool(await self._renew(keys=[self.key], args=[self.token, int(self.ttl * 1000)]))
+
+    async def release(self):
+        try:
+            await self._release(keys=[self.key], args=[self.token])
+        except Exception as e:
+            logger.warning(f"Chyba pri uvoľňovaní vodcovstva {self.key}: {str(e)}")
+
+    async def keep_alive(self):
+        """
+        Obnovuje prenájom, skončí keď ho proces stratí (alebo ho nevie
+        obnoviť dlhšie ako TTL mínus jeden interval obnovy)
+        """
+        last_renewed = time.monotonic()
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                if not await self.renew():
+                    logger.warning(f"Vodcovstvo {self.key} prevzal iný proces")
+                    return
+                last_renewed = time.monotonic()
+            except Exception as e:
+                logger.error(f"Chyba pri obnove vodcovstva {self.key}: {str(e)}")
+                if time.monotonic() - last_renewed >= self.ttl - self.renew_interval:
+                    logger.warning(f"Vodcovstvo {self.key} sa nepodarilo obnoviť včas")
+                    return
+
+async def run_as_leader(lease: LeaderLease, job):
+    """
+    Donekonečna sa uchádza o vodcovstvo a počas neho spúšťa job()
+
+    job() sa zruší hneď, ako proces vodcovstvo stratí, a po jeho
+    znovuzískaní sa spustí odznova.
+    """
+    while True:
+        try:
+            acquired = await lease.acquire()
+        except Exception as e:
+            logger.error(f"Chyba pri získavaní vodcovstva {lease.key}: {str(e)}")
+            acquired = False
+
+        if not acquired:
+            await asyncio.sleep(lease.renew_interval)
+            continue
+
+        logger.info(f"Proces {lease.token} je vodcom {lease.key}")
+        job_task = asyncio.create_task(job())
+        keep_alive_task = asyncio.create_task(lease.keep_alive())
+        try:
+            done, _ = await asyncio.wait([job_task, keep_alive_task], return_when=asyncio.FIRST_COMPLETED)
+            if job_task in done and job_task.exception() is not None:
+                logger.error(f"Úloha vodcu {lease.key} skončila chybou: {str(job_task.exception())}")
+        finally:
+            job_task.cancel()
+            keep_alive_task.cancel()
+            await asyncio.gather(job_task, keep_alive_task, return_exceptions=True)
+            await lease.release()
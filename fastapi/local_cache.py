@@ -0,0 +1,70 @@
+from collections import Counter, OrderedDict
+import threading
+import time
+
+# Značka pre chýbajúcu hodnotu (None je platná hodnota v cache)
+MISSING = object()
+
+class LocalCache:
+    """
+    Ohraničená in-process LRU cache s TTL pre každý záznam
+
+    Záznamy sú rozdelené do rodín (rovnakých ako v Redis cache). Každá
+    rodina má lokálnu epochu, invalidácia rodiny iba zvýši epochu a staré
+    záznamy sa zahodia pri ďalšom čítaní alebo vypadnú cez LRU.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # (rodina, kľúč) -> (expires_at, epocha, hodnota)
+        self._epochs = Counter()
+        self._lock = threading.Lock()
+
+    def epoch(self, family: str) -> int:
+        with self._lock:
+            return self._epochs[family]
+
+    def get(self, family: str, key: str):
+        entry_key = (family, key)
+        with self._lock:
+            entry = self._data.get(entry_key)
+            if entry is None:
+                return MISSING
+            expires_at, epoch, value = entry
+            if expires_at <= time.monotonic() or epoch != self._epochs[family]:
+                del self._data[entry_key]
+                return MISSING
+            self._data.move_to_end(entry_key)
+            return value
+
+    def set(self, family: str, key: str, value, ttl: float = None, epoch: int = None):
+        """
+        Uloží hodnotu; ak je zadaná epoch a rodina bola medzitým
+        invalidovaná, hodnota sa neuloží (bola vypočítaná zo starých dát)
+        """
+        if self.maxsize <= 0:
+            return
+        entry_key = (family, key)
+        with self._lock:
+            current_epoch = self._epochs[family]
+            if epoch is not None and epoch != current_epoch:
+                return
+            ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+            self._data[entry_key] = (time.monotonic() + ttl, current_epoch, value)
+            self._data.move_to_end(entry_key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, family: str):
+        with self._lock:
+            self._epochs[family] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            for family in list(self._epochs):
+                self._epochs[family] += 1
+
+    def __len__(self):
+        return len(self._data)
\ No newline at end of file
@@ -1,22 +1,29 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Query, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import FastAPI, HTTPException, Depends, status, Query, BackgroundTasks, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, ORJSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Set
+from datetime import datetime
 import crud
 import models
 import schemas
-from database import SessionLocal, engine
+import ingestion
+import coingecko
+import analytics
+import export
+from serialization import json_response, dumps, loads
+from database import AsyncSessionLocal, engine, async_engine, get_async_db
 from redis_client import (
-    get_cached_data,
-    set_cached_data,
-    invalidate_cache,
-    COIN_CACHE_KEY,
-    MARKET_DATA_CACHE_KEY,
-    TOP_COINS_CACHE_KEY,
-    redis_client
+    get_cache_stats,
+    start_invalidation_listener,
+    stop_invalidation_listener,
+    close_clients
 )
 from config import settings
 from fastapi.middleware.cors import CORSMiddleware
-from background_tasks import start_price_updates
+from background_tasks import start_price_updates, stop_price_updates
+from streaming import broadcaster, parse_subscription_message
+from metrics import MetricsMiddleware, render_metrics
+import asyncio
 import logging
 
 # Nastavenie logovania
@@ -25,11 +32,14 @@ logger = logging.getLogger(__name__)
 
 # Vytvorenie tabuliek
 schemas.Base.metadata.create_all(bind=engine)
+ingestion.migrate_legacy_metadata(engine)
+ingestion.ensure_indexes(engine)
 
 app = FastAPI(
     title="Crypto API",
     description="API pre správu kryptomien a ich cien",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Povolenie CORS
@@ -41,209 +51,465 @@ app.add_middleware(
     allow_headers=["*"],  # Povolí všetky hlavičky
 )
 
-# Dependency pre získanie DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Latencia a počet SQL príkazov pre každú route (/metrics)
+app.add_middleware(MetricsMiddleware)
 
 @app.on_event("startup")
 async def startup_event():
     """
     Spustí background tasks pri štarte aplikácie
     """
-    db = SessionLocal()
-    try:
-        start_price_updates(db)
-    finally:
-        db.close()
+    start_invalidation_listener()
+    if settings.RUN_INGESTION_IN_API:
+        start_price_updates()
+    broadcaster.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    redis_client.close()
+    await stop_price_updates()
+    await ingestion.stop_onboarding()
+    await broadcaster.stop()
+    await stop_invalidation_listener()
+    await coingecko.close_client()
+    await async_engine.dispose()
+    await close_clients()
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Vitajte v Crypto API"}
 
-@app.get("/coins", response_model=List[models.Coin])
-def get_coins(
-    skip: int = 0, 
-    limit: int = 100, 
+@app.get("/coins", response_model=models.CoinPage)
+async def get_coins(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = Query("coin_id", pattern="^(coin_id|market_cap)$"),
     include_metadata: bool = False, 
     include_prices: bool = False,
-    db: Session = Depends(get_db)
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Získanie zoznamu kryptomien s podporou stránkovania.
+    Získanie zoznamu kryptomien s kurzorovým stránkovaním.
     
     Parameters:
-    - skip: Počet záznamov ktoré sa majú preskočiť
+    - cursor: Kurzor z next_cursor predchádzajúcej odpovede (prvá stránka bez kurzora)
     - limit: Maximálny počet záznamov ktoré sa majú vrátiť
+    - sort: Zoradenie podľa "coin_id" alebo "market_cap"
     - include_metadata: Ak True, vráti aj metadáta kryptomien
     - include_prices: Ak True, vráti aj aktuálne ceny kryptomien
+    - include_total: Ak True, vráti aj celkový počet kryptomien (cachovaný)
     """
     try:
-        cache_key = f"coins:{skip}:{limit}:{include_metadata}:{include_prices}"
-        cached_data = get_cached_data(cache_key)
-        
-        if cached_data:
-            return cached_data
-        
-        coins = crud.get_coins(
+        # Odpoveď sa vracia ako hotové JSON bajty, bez validácie cez response_model
+        return json_response(await crud.get_coins_json(
             db, 
-            skip=skip, 
+            cursor=cursor, 
             limit=limit, 
+            sort=sort,
             include_metadata=include_metadata,
-            include_prices=include_prices
-        )
-        
-        # Konvertujeme Pydantic modely na slovníky a serializujeme dátumy
-        coins_dict = []
-        for coin in coins:
-            coin_dict = coin.dict()
-            # Konvertujeme dátumy na ISO formát
-            if coin_dict.get('created_at'):
-                coin_dict['created_at'] = coin_dict['created_at'].isoformat()
-            if coin_dict.get('updated_at'):
-                coin_dict['updated_at'] = coin_dict['updated_at'].isoformat()
-            coins_dict.append(coin_dict)
-            
-        set_cached_data(cache_key, coins_dict)
-        
-        return coins
+            include_prices=include_prices,
+            include_total=include_total
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chyba pri získavaní kryptomien: {str(e)}")
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Porovná hlavičku If-None-Match s ETagom (slabé porovnanie podľa RFC 9110)
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
+
 @app.get("/coins/{coin_id}", response_model=models.Coin)
-def read_coin(coin_id: str, include_metadata: bool = False, db: Session = Depends(get_db)):
+async def read_coin(coin_id: str, request: Request, include_metadata: bool = False, db: AsyncSession = Depends(get_async_db)):
     """
     Získanie detailov kryptomeny podľa ID.
     
     Parameters:
     - coin_id: ID kryptomeny
-    - include_metadata: Ak True, vráti aj metadáta kryptomeny
+    - include_metadata: Ak True, vráti aj metadáta kryptomeny (s ETagom, pri zhode If-None-Match vráti 304)
     """
     try:
-        cache_key = f"coin:{coin_id}:{include_metadata}"
-        cached_data = get_cached_data(cache_key)
-        
-        if cached_data:
-            return cached_data
-        
-        db_coin = crud.get_coin(db, coin_id=coin_id, include_metadata=include_metadata)
-        
-        # Konvertujeme Pydantic model na slovník a serializujeme dátumy
-        coin_dict = db_coin.dict()
-        # Konvertujeme dátumy na ISO formát
-        if coin_dict.get('created_at'):
-            coin_dict['created_at'] = coin_dict['created_at'].isoformat()
-        if coin_dict.get('updated_at'):
-            coin_dict['updated_at'] = coin_dict['updated_at'].isoformat()
-            
-        set_cached_data(cache_key, coin_dict)
-        
-        return db_coin
+        if include_metadata:
+            etag = await crud.get_coin_etag(db, coin_id=coin_id)
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if _etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+            return json_response(await crud.get_coin_json(db, coin_id=coin_id, include_metadata=True), headers=headers)
+        return json_response(await crud.get_coin_json(db, coin_id=coin_id, include_metadata=include_metadata))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chyba pri získavaní kryptomeny: {str(e)}")
 
 @app.post("/coins", response_model=models.Coin)
-def create_coin(coin_id: str, db: Session = Depends(get_db)):
+async def create_coin(coin_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Vytvorí novú kryptomenu v databáze.
     
     Parameters:
     - coin_id: ID kryptomeny z CoinGecko API (napr. "bitcoin")
     """
-    return crud.create_coin(db=db, coin_id=coin_id)
+    try:
+        return await ingestion.create_coin(db=db, coin_id=coin_id)
+    except coingecko.RateLimitError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/coins/batch", response_model=models.OnboardingJob, status_code=status.HTTP_202_ACCEPTED)
+async def create_coins_batch(batch: models.CoinBatchCreate):
+    """
+    Hromadne pridá kryptomeny ako úlohu na pozadí.
+    
+    Už existujúce ID sa preskočia, metadáta sa sťahujú súbežne, kryptomeny
+    sa vložia jednou transakciou a ceny sa obnovia jedným dávkovým cyklom.
+    Priebeh vráti GET /coins/batch/{job_id}.
+    """
+    if len(batch.coin_ids) > settings.ONBOARDING_MAX_COINS:
+        raise HTTPException(status_code=400, detail=f"Najviac {settings.ONBOARDING_MAX_COINS} kryptomien v jednej úlohe")
+    return await ingestion.start_onboarding(batch.coin_ids)
 
-@app.get("/market/top")
-async def get_top_coins(limit: int = 10, db: Session = Depends(get_db)):
+@app.get("/coins/batch/{job_id}", response_model=models.OnboardingJob)
+async def get_coins_batch(job_id: str):
+    """
+    Priebeh úlohy hromadného pridania kryptomien.
+    """
+    try:
+        return await ingestion.get_onboarding_job(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/market/top", response_model=List[models.RankedCoin])
+async def get_top_coins(
+    limit: int = Query(10, ge=1, le=250),
+    by: str = Query("market_cap", pattern="^(market_cap|volume|change)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Získanie top kryptomien podľa trhovej kapitalizácie.
     
     Parameters:
     - limit: Počet kryptomien ktoré sa majú vrátiť
+    - by: Zoradenie podľa "market_cap", "volume" (24h objem) alebo "change" (24h zmena)
     """
     try:
-        cache_key = TOP_COINS_CACHE_KEY.format(limit)
-        cached_data = get_cached_data(cache_key)
-        
-        if cached_data:
-            return cached_data
-        
-        top_coins = crud.get_coins(db=db, limit=limit)
-        
-        # Konvertujeme Pydantic modely na slovníky a serializujeme dátumy
-        coins_dict = []
-        for coin in top_coins:
-            coin_dict = coin.dict()
-            # Konvertujeme dátumy na ISO formát
-            if coin_dict.get('created_at'):
-                coin_dict['created_at'] = coin_dict['created_at'].isoformat()
-            if coin_dict.get('updated_at'):
-                coin_dict['updated_at'] = coin_dict['updated_at'].isoformat()
-            coins_dict.append(coin_dict)
-            
-        set_cached_data(cache_key, coins_dict)
-        
-        return top_coins
+        return json_response(await crud.get_top_coins(db=db, limit=limit, by=by))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chyba pri získavaní top kryptomien: {str(e)}")
 
 @app.delete("/coins/{coin_id}")
-def delete_coin(coin_id: str, db: Session = Depends(get_db)):
+async def delete_coin(coin_id: str, db: AsyncSession = Depends(get_async_db)):
     try:
-        crud.delete_coin(db=db, coin_id=coin_id)
+        await crud.delete_coin(db=db, coin_id=coin_id)
         return {"message": f"Kryptomena {coin_id} bola úspešne vymazaná"}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chyba pri mazaní kryptomeny: {str(e)}")
 
+def _parse_currencies(vs: Optional[str]) -> Optional[List[str]]:
+    """
+    Rozdelí zoznam mien oddelených čiarkou (napr. "eur,gbp"), None znamená iba USD
+    """
+    if not vs:
+        return None
+    return list(dict.fromkeys(currency.strip().lower() for currency in vs.split(",") if currency.strip())) or None
+
 @app.get("/prices", response_model=List[models.CoinPrice])
-def get_prices(coin_ids: str = Query(..., description="ID kryptomien oddelené čiarkou"), db: Session = Depends(get_db)):
+async def get_prices(
+    coin_ids: str = Query(..., description="ID kryptomien oddelené čiarkou"),
+    vs: Optional[str] = Query(None, description="Ďalšie meny oddelené čiarkou (napr. \"eur,gbp\")"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Získanie cien pre zoznam kryptomien
+    Získanie cien pre zoznam kryptomien zo snapshotu v databáze / Redis.
+    Odpoveď obsahuje vek dát (age_seconds) a príznak stale.
     
     Parameters:
     - coin_ids: ID kryptomien oddelené čiarkou (napr. "bitcoin,ethereum")
+    - vs: Meny, do ktorých sa ceny prepočítajú z USD (pole quotes)
     """
     try:
         coin_id_list = [coin_id.strip() for coin_id in coin_ids.split(",")]
-        prices = crud.get_coin_prices(db, coin_id_list)
+        prices = await crud.get_coin_prices(db, coin_id_list, vs=_parse_currencies(vs))
         
         if not prices:
             raise HTTPException(status_code=404, detail="Žiadne ceny neboli nájdené")
             
-        return prices
+        return json_response(prices)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chyba pri získavaní cien: {str(e)}")
 
 @app.get("/prices/{coin_id}", response_model=models.CoinPrice)
-def get_price(coin_id: str, db: Session = Depends(get_db)):
+async def get_price(
+    coin_id: str,
+    vs: Optional[str] = Query(None, description="Ďalšie meny oddelené čiarkou (napr. \"eur,gbp\")"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Získanie ceny pre jednu kryptomenu
+    Získanie ceny pre jednu kryptomenu zo snapshotu v databáze / Redis.
+    Odpoveď obsahuje vek dát (age_seconds) a príznak stale.
     
     Parameters:
     - coin_id: ID kryptomeny (napr. "bitcoin")
+    - vs: Meny, do ktorých sa cena prepočíta z USD (pole quotes), nepodporovaná mena vráti 400
     """
     try:
-        price = crud.get_coin_price(db, coin_id)
+        price = await crud.get_coin_price(db, coin_id, vs=_parse_currencies(vs))
         if not price:
             raise HTTPException(status_code=404, detail=f"Cena pre kryptomenu {coin_id} nebola nájdená")
-        return price
+        return json_response(price)
     except HTTPException:
         raise
+    except crud.UnsupportedCurrencyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chyba pri získavaní ceny: {str(e)}")
 
+@app.get("/prices/{coin_id}/history", response_model=models.PriceHistory, response_model_by_alias=True)
+async def get_price_history(
+    coin_id: str,
+    start: Optional[datetime] = Query(None, alias="from", description="Začiatok rozsahu (default: to - 24h)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Koniec rozsahu (default: teraz)"),
+    interval: Optional[str] = Query(None, pattern="^(1m|5m|15m|1h|4h|1d)$"),
+    limit: int = Query(5000, ge=1, le=50000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Získanie histórie cien pre jednu kryptomenu
+    
+    Parameters:
+    - coin_id: ID kryptomeny (napr. "bitcoin")
+    - from / to: Časový rozsah v ISO 8601
+    - interval: Vzorkovanie (posledná cena v okne z OHLCV rollupov, bez kapitalizácie a 24h zmeny), bez intervalu vráti všetky ticky
+    - limit: Maximálny počet bodov, pri prekročení sa vráti najnovších limit bodov (truncated)
+    """
+    try:
+        return json_response(await crud.get_price_history(db, coin_id, start=start, end=end, interval=interval, limit=limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chyba pri získavaní histórie cien: {str(e)}")
+
+@app.get("/prices/{coin_id}/ohlc", response_model=models.PriceOHLC, response_model_by_alias=True)
+async def get_price_ohlc(
+    coin_id: str,
+    resolution: str = Query("1h", pattern="^[0-9]+[mhdw]$", description="Rozlíšenie sviečok, napr. 1m, 15m, 4h, 1d"),
+    start: Optional[datetime] = Query(None, alias="from", description="Začiatok rozsahu"),
+    end: Optional[datetime] = Query(None, alias="to", description="Koniec rozsahu (default: teraz)"),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Získanie OHLCV sviečok pre jednu kryptomenu
+    
+    Parameters:
+    - coin_id: ID kryptomeny (napr. "bitcoin")
+    - resolution: Rozlíšenie sviečok, skladá sa z najhrubšieho uloženého rollupu (1m/5m/1h/1d)
+    - from / to: Časový rozsah v ISO 8601 (default: posledných limit sviečok)
+    - limit: Maximálny počet sviečok
+    """
+    try:
+        return json_response(await crud.get_price_ohlc(db, coin_id, resolution=resolution, start=start, end=end, limit=limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chyba pri získavaní OHLC dát: {str(e)}")
+
+@app.get("/analytics", response_model=models.Analytics, response_model_by_alias=True)
+async def get_analytics(
+    coin_ids: str = Query(..., description="ID kryptomien oddelené čiarkou, napr. bitcoin,ethereum"),
+    window: str = Query("30d", pattern="^[0-9]+[mhdw]$", description="Dĺžka okna, napr. 7d, 30d, 12w"),
+    resolution: str = Query("1h", pattern="^(1m|5m|1h|1d)$", description="Rollup, z ktorého sa počítajú výnosy"),
+    rolling: int = Query(24, ge=1, le=10000, description="Počet období pre rolling metriky"),
+    include_correlation: bool = Query(True, description="Zahrnúť korelačnú maticu výnosov"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Výnosy, volatilita, max. drawdown a korelácia pre zoznam kryptomien
+    
+    Parameters:
+    - coin_ids: ID kryptomien oddelené čiarkou
+    - window: Dĺžka analyzovaného okna
+    - resolution: Rozlíšenie OHLCV rollupu (1m/5m/1h/1d)
+    - rolling: Počet posledných období pre rolling výnos a volatilitu
+    - include_correlation: Zahrnúť párovú koreláciu výnosov
+    """
+    ids = [coin_id.strip() for coin_id in coin_ids.split(",") if coin_id.strip()]
+    if not ids:
+        raise HTTPException(status_code=400, detail="Zadajte aspoň jedno ID kryptomeny")
+    try:
+        return json_response(await analytics.get_analytics_json(
+            db,
+            ids,
+            window=window,
+            resolution=resolution,
+            rolling=rolling,
+            include_correlation=include_correlation
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chyba pri výpočte analytiky: {str(e)}")
+
+def _parse_coin_ids(coin_ids: Optional[str]) -> Optional[Set[str]]:
+    """
+    Rozdelí zoznam ID oddelených čiarkou, None znamená všetky kryptomeny
+    """
+    if not coin_ids:
+        return None
+    return {coin_id.strip() for coin_id in coin_ids.split(",") if coin_id.strip()} or None
+
+async def _price_snapshot(coin_ids: Optional[Set[str]]) -> list:
+    """
+    Aktuálne ceny pre nového odberateľa streamingu (iba pri explicitnom zozname)
+    """
+    if not coin_ids:
+        return []
+    async with AsyncSessionLocal() as db:
+        return await crud.get_coin_prices(db, sorted(coin_ids))
+
+@app.websocket("/ws/prices")
+async def websocket_prices(websocket: WebSocket, coin_ids: Optional[str] = None):
+    """
+    Streaming zmien cien cez WebSocket
+    
+    Po pripojení príde správa {"type": "snapshot", "data": [...]} s aktuálnymi
+    cenami, potom {"type": "prices", "data": [...]} iba so zmenenými cenami.
+    Odber sa dá zmeniť správou {"coin_ids": ["bitcoin", ...]} (najviac
+    STREAM_MAX_COIN_IDS), na neplatnú správu príde {"type": "error", "detail": ...}.
+    
+    Parameters:
+    - coin_ids: ID kryptomien oddelené čiarkou (default: všetky kryptomeny)
+    """
+    await websocket.accept()
+    subscription = broadcaster.subscribe(_parse_coin_ids(coin_ids))
+
+    async def send_updates():
+        snapshot = await _price_snapshot(subscription.coin_ids)
+        await websocket.send_text(dumps({"type": "snapshot", "data": snapshot}).decode())
+        while True:
+            updates = await subscription.get(timeout=settings.STREAM_HEARTBEAT_INTERVAL)
+            if updates:
+                await websocket.send_text(dumps({"type": "prices", "data": updates}).decode())
+            else:
+                await websocket.send_text('{"type":"ping"}')
+
+    async def receive_subscriptions():
+        while True:
+            text = await websocket.receive_text()
+            try:
+                subscription.coin_ids = parse_subscription_message(loads(text))
+            except ValueError as e:
+                # Neplatný JSON (orjson.JSONDecodeError je ValueError) alebo tvar správy
+                await websocket.send_text(dumps({"type": "error", "detail": str(e)}).decode())
+
+    tasks = [asyncio.create_task(send_updates()), asyncio.create_task(receive_subscriptions())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.warning(f"WebSocket spojenie ukončené chybou: {str(error)}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        broadcaster.unsubscribe(subscription)
+
+@app.get("/stream/prices")
+async def stream_prices(request: Request, coin_ids: Optional[str] = Query(None, description="ID kryptomien oddelené čiarkou")):
+    """
+    Streaming zmien cien cez Server-Sent Events
+    
+    Prvá udalosť "snapshot" obsahuje aktuálne ceny, ďalšie udalosti
+    "prices" iba zmenené ceny.
+    
+    Parameters:
+    - coin_ids: ID kryptomien oddelené čiarkou (default: všetky kryptomeny)
+    """
+    subscription = broadcaster.subscribe(_parse_coin_ids(coin_ids))
+
+    async def events():
+        try:
+            snapshot = await _price_snapshot(subscription.coin_ids)
+            yield b"event: snapshot\ndata: " + dumps(snapshot) + b"\n\n"
+            while not await request.is_disconnected():
+                updates = await subscription.get(timeout=settings.STREAM_HEARTBEAT_INTERVAL)
+                if updates:
+                    yield b"event: prices\ndata: " + dumps(updates) + b"\n\n"
+                else:
+                    yield b": ping\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/export/prices")
+async def export_prices(
+    format: str = Query("csv", pattern="^(csv|ndjson|arrow|parquet)$"),
+    dataset: str = Query("current", pattern="^(current|history)$", description="current = aktuálne ceny, history = ticky"),
+    coin_ids: Optional[str] = Query(None, description="ID kryptomien oddelené čiarkou (default: všetky)"),
+    start: Optional[datetime] = Query(None, alias="from", description="Začiatok rozsahu pre history"),
+    end: Optional[datetime] = Query(None, alias="to", description="Koniec rozsahu pre history")
+):
+    """
+    Hromadný export cien ako stream (CSV, NDJSON, Apache Arrow alebo Parquet)
+
+    Dáta sa čítajú z databázy po dávkach cez server-side kurzor, bez
+    stránkovania a bez požiadaviek na CoinGecko. Formáty arrow a parquet
+    vyžadujú na serveri balík pyarrow.
+    """
+    try:
+        export.check_export(dataset, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    coin_id_set = _parse_coin_ids(coin_ids)
+    media_type, extension = export.EXPORT_FORMATS[format]
+    # Slot obsadíme pred odoslaním hlavičiek, uvoľní ho ExportResponse po prenose
+    if not await export.try_acquire_slot():
+        raise HTTPException(status_code=503, detail="Príliš veľa súbežných exportov", headers={"Retry-After": "10"})
+    return export.ExportResponse(
+        export.stream_prices(dataset, format, sorted(coin_id_set) if coin_id_set else None, start, end),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="prices-{dataset}.{extension}"'}
+    )
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Metriky pre Prometheus (HTTP, cache, databáza, CoinGecko, aktualizácia cien)
+    """
+    body, media_type = render_metrics()
+    return Response(content=body, media_type=media_type)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Počty zásahov a výpadkov cache pre každú rodinu kľúčov (v rámci procesu)
+    """
+    return get_cache_stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
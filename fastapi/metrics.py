@@ -0,0 +1,150 @@
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import event
+from starlette.routing import Match
+from contextvars import ContextVar
+import time
+
+# HTTP API
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Trvanie HTTP požiadaviek (pri streamingu celý prenos)",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+# Cache (rodiny z redis_client.CACHE_TTLS)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Čítania cache podľa rodiny a výsledku (l1_hit, hit, stale_hit, miss)",
+    ["family", "result"]
+)
+
+# Databáza
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Trvanie SQL príkazov podľa route (background mimo HTTP požiadaviek)",
+    ["route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Počet SQL príkazov na jednu HTTP požiadavku",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+
+# CoinGecko
+COINGECKO_REQUEST_DURATION = Histogram(
+    "coingecko_request_duration_seconds",
+    "Trvanie požiadaviek na CoinGecko podľa endpointu a HTTP statusu",
+    ["endpoint", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+COINGECKO_RATE_LIMIT_WAIT = Histogram(
+    "coingecko_rate_limit_wait_seconds",
+    "Čakanie na rozpočet požiadaviek pred odoslaním na CoinGecko",
+    buckets=(0.0, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+COINGECKO_RATE_LIMIT_TOKENS = Gauge(
+    "coingecko_rate_limit_tokens",
+    "Aktuálne dostupný rozpočet požiadaviek na CoinGecko"
+)
+
+# Aktualizácia cien
+PRICE_REFRESH_DURATION = Histogram(
+    "price_refresh_duration_seconds",
+    "Trvanie jedného cyklu aktualizácie cien",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+PRICE_REFRESH_LAG = Gauge(
+    "price_refresh_lag_seconds",
+    "O koľko je najstaršia splatná obnova ceny po termíne (na začiatku cyklu)"
+)
+PRICE_REFRESH_COINS = Counter(
+    "price_refresh_coins_total",
+    "Obnovené kryptomeny podľa výsledku (changed, unchanged, missing, failed)",
+    ["result"]
+)
+PRICE_REFRESH_ERRORS = Counter(
+    "price_refresh_errors_total",
+    "Neúspešné cykly aktualizácie cien"
+)
+PRICE_LAST_REFRESH = Gauge(
+    "price_last_refresh_timestamp_seconds",
+    "Unix čas posledného úspešného cyklu aktualizácie cien"
+)
+
+class RequestStats:
+    """
+    SQL štatistiky jednej HTTP požiadavky (zdieľané cez contextvar)
+    """
+
+    def __init__(self, route: str):
+        self.route = route
+        self.queries = 0
+
+_request_stats: ContextVar = ContextVar("request_stats", default=None)
+
+def _route_template(scope) -> str:
+    """
+    Šablóna cesty (napr. /coins/{coin_id}), aby počet sérií nezávisel od ID v URL
+    """
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware, ktorý meria trvanie požiadaviek a počet SQL príkazov na route
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(_route_template(scope))
+        token = _request_stats.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_DURATION.labels(scope["method"], stats.route, str(status)).observe(time.perf_counter() - start)
+            DB_QUERIES_PER_REQUEST.labels(stats.route).observe(stats.queries)
+            _request_stats.reset(token)
+
+def instrument_engine(engine):
+    """
+    Zaregistruje SQLAlchemy eventy pre meranie SQL príkazov (sync engine, pri async engine jeho sync_engine)
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+        DB_QUERY_DURATION.labels(stats.route if stats is not None else "background").observe(
+            time.perf_counter() - context._query_start
+        )
+
+def render_metrics():
+    """
+    Metriky vo formáte pre Prometheus (obsah, media type)
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List, Dict
 from datetime import datetime, date
 import uuid
 
@@ -23,6 +23,29 @@ class Coin(CoinBase):
             datetime: lambda dt: dt.isoformat() if dt else None
         }
 
+class CoinBatchCreate(BaseModel):
+    coin_ids: List[str] = Field(..., min_length=1, description="ID kryptomien z CoinGecko API")
+
+class OnboardingJob(BaseModel):
+    job_id: str
+    status: str = Field(..., description="pending, running, refreshing_prices, done alebo failed")
+    total: int = Field(..., description="Počet unikátnych ID v požiadavke")
+    skipped: int = Field(..., description="Počet už existujúcich kryptomien")
+    fetched: int = Field(..., description="Počet stiahnutých kryptomien, ktoré prešli kontrolou polí")
+    failed: int = Field(..., description="Počet kryptomien, ktoré sa nepodarilo stiahnuť")
+    created: int = Field(..., description="Počet vytvorených kryptomien")
+    errors: dict = Field(default_factory=dict, description="Chyby podľa ID kryptomeny")
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+class CoinPage(BaseModel):
+    items: List[Coin]
+    next_cursor: Optional[str] = Field(default=None, description="Kurzor pre ďalšiu stránku, None ak ďalšia stránka neexistuje")
+    total: Optional[int] = Field(default=None, description="Celkový počet kryptomien (iba ak include_total=True)")
+
+class RankedCoin(Coin):
+    rank: int = Field(..., description="Poradie v rebríčku (od 1)")
+
 class CoinPriceBase(BaseModel):
     usd: float = Field(..., description="Cena v USD")
     usd_market_cap: Optional[float] = Field(None, description="Trhová kapitalizácia v USD")
@@ -32,11 +55,82 @@ class CoinPriceBase(BaseModel):
 class CoinPriceCreate(CoinPriceBase):
     coin_id: str = Field(..., description="ID kryptomeny z CoinGecko API")
 
+class PriceQuote(BaseModel):
+    price: float = Field(..., description="Cena v danej mene")
+    market_cap: Optional[float] = Field(None, description="Trhová kapitalizácia v danej mene")
+    volume_24h: Optional[float] = Field(None, description="24h objem v danej mene")
+
 class CoinPrice(CoinPriceBase):
     coin_id: str
     created_at: datetime
     updated_at: datetime
     last_updated_at: datetime
+    age_seconds: Optional[float] = Field(None, description="Vek cenových dát v sekundách")
+    stale: bool = Field(False, description="True ak vek dát prekročil PRICE_MAX_STALENESS")
+    quotes: Optional[Dict[str, PriceQuote]] = Field(None, description="Prepočet ceny do mien z parametra vs")
+
+    class Config:
+        from_attributes = True
+
+class PriceHistoryPoint(BaseModel):
+    ts: datetime
+    usd: float
+    usd_market_cap: Optional[float] = None
+    usd_24h_vol: Optional[float] = None
+    usd_24h_change: Optional[float] = None
+
+class PriceHistory(BaseModel):
+    coin_id: str
+    interval: Optional[str] = Field(None, description="Interval vzorkovania, None pre všetky ticky")
+    from_: datetime = Field(..., alias="from")
+    to: datetime
+    truncated: bool = Field(False, description="V rozsahu bolo viac ako limit bodov, vrátené sú najnovšie")
+    points: List[PriceHistoryPoint]
+
+    class Config:
+        populate_by_name = True
+
+class Candle(BaseModel):
+    bucket: datetime = Field(..., description="Začiatok okna sviečky")
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: Optional[float] = Field(None, description="Posledný 24h objem v USD v rámci okna")
+
+class PriceOHLC(BaseModel):
+    coin_id: str
+    resolution: str
+    source_resolution: str = Field(..., description="Uložený rollup, z ktorého boli sviečky poskladané")
+    from_: datetime = Field(..., alias="from")
+    to: datetime
+    candles: List[Candle]
+
+    class Config:
+        populate_by_name = True
+
+class CoinMetrics(BaseModel):
+    coin_id: str
+    observations: int = Field(..., description="Počet výnosov v okne")
+    total_return: Optional[float] = Field(None, description="Výnos za celé okno")
+    volatility: Optional[float] = Field(None, description="Anualizovaná volatilita logaritmických výnosov")
+    max_drawdown: Optional[float] = Field(None, description="Najväčší pokles od maxima v okne")
+    rolling_return: Optional[float] = Field(None, description="Výnos za posledných rolling období")
+    rolling_volatility: Optional[float] = Field(None, description="Anualizovaná volatilita za posledných rolling období")
+
+class CorrelationMatrix(BaseModel):
+    coin_ids: List[str]
+    matrix: List[List[Optional[float]]]
+
+class Analytics(BaseModel):
+    window: str
+    resolution: str
+    rolling: int
+    from_: datetime = Field(..., alias="from")
+    to: datetime
+    periods: int
+    coins: List[CoinMetrics]
+    correlation: Optional[CorrelationMatrix] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        populate_by_name = True
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Token bucket pre rozpočet požiadaviek na externé API (pre asyncio)
+
+    Tokeny pribúdajú rýchlosťou rate za sekundu až do capacity, každá
+    požiadavka spotrebuje jeden. Po odpovedi 429 sa dopĺňanie pozastaví
+    do času z hlavičky Retry-After.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refilled(self, now: float) -> float:
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            return min(self.capacity, self._tokens + (now - start) * self.rate)
+        return self._tokens
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = self._refilled(now)
+        self._updated = max(now, self._updated)
+
+    def available(self) -> float:
+        """
+        Počet tokenov dostupných hneď (0 počas pauzy po 429)
+
+        Stav nemení, takže ju môže volať aj callback metrík z iného vlákna.
+        """
+        now = time.monotonic()
+        if now < self._paused_until:
+            return 0.0
+        return self._refilled(now)
+
+    async def acquire(self):
+        """
+        Počká, kým je k dispozícii token, a spotrebuje ho
+        """
+        async with self._lock:
+            while True:
+                self._refill()
+                now = time.monotonic()
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate if self.rate > 0 else 1.0)
+                await asyncio.sleep(max(wait, 0.01))
+
+    def pause(self, seconds: float):
+        """
+        Pozastaví požiadavky na seconds sekúnd a zahodí ušetrené tokeny
+        """
+        self._refill()
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+# Doplní a spotrebuje token zdieľaného rozpočtu, vráti {čakanie v ms, zostatok, zvyšok pauzy v ms}.
+# Čas berieme z Redis (TIME), aby sa procesy nelíšili hodinami. Počas pauzy
+# po 429 je "updated" v budúcnosti a tokeny sa nedopĺňajú.
+_ACQUIRE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+if now > updated then
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    updated = now
+end
+local wait = 0
+if now < updated then
+    wait = updated - now + math.ceil(math.max(1 - tokens, 0) / rate)
+elseif tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', updated)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate) + (updated - now) + 1000)
+return {wait, tostring(tokens), math.max(updated - now, 0)}
+"""
+
+# Pozastaví zdieľaný rozpočet na ARGV[1] ms a zahodí ušetrené tokeny
+_PAUSE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local until_ms = now + tonumber(ARGV[1])
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated')) or now
+if updated > until_ms then
+    until_ms = updated
+end
+redis.call('HSET', KEYS[1], 'tokens', 0, 'updated', until_ms)
+redis.call('PEXPIRE', KEYS[1], until_ms - now + 60000)
+return until_ms - now
+"""
+
+class SharedTokenBucket:
+    """
+    Token bucket zdieľaný všetkými procesmi cez Redis
+
+    Stav (tokeny, čas poslednej zmeny) je v Redis hashi a mení sa atomicky
+    Lua skriptom, takže API procesy aj worker čerpajú z jedného rozpočtu
+    a pauza po 429 platí pre všetkých. Ak Redis nie je dostupný, požiadavky
+    sa riadia lokálnym TokenBucket s rovnakými parametrami.
+    """
+
+    def __init__(self, redis, key: str, rate: float, capacity: float):
+        self.key = key
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.local = TokenBucket(rate, capacity)
+        self._acquire = redis.register_script(_ACQUIRE_SCRIPT)
+        self._pause = redis.register_script(_PAUSE_SCRIPT)
+        # Posledný známy zostatok zdieľaného rozpočtu (pre available())
+        self._tokens = self.capacity
+        self._seen = time.monotonic()
+        self._paused_until = 0.0
+
+    def available(self) -> float:
+        """
+        Odhad dostupných tokenov z posledného známeho stavu (bez volania Redis)
+        """
+        now = time.monotonic()
+        if now < self._paused_until:
+            return 0.0
+        start = max(self._seen, self._paused_until)
+        return min(self.capacity, self._tokens + (now - start) * self.rate)
+
+    async def acquire(self):
+        """
+        Počká, kým je v zdieľanom rozpočte token, a spotrebuje ho
+        """
+        while True:
+            try:
+                wait, tokens, paused = await self._acquire(keys=[self.key], args=[self.rate / 1000, self.capacity])
+            except Exception as e:
+                logger.warning(f"Zdieľaný rozpočet {self.key} nie je dostupný, použije sa lokálny: {str(e)}")
+                await self.local.acquire()
+                return
+            self._tokens = float(tokens)
+            self._seen = time.monotonic()
+            self._paused_until = self._seen + int(paused) / 1000
+            if int(wait) <= 0:
+                return
+            await asyncio.sleep(max(int(wait) / 1000, 0.01))
+
+    async def pause(self, seconds: float):
+        """
+        Pozastaví požiadavky všetkých procesov na seconds sekúnd
+        """
+        self.local.pause(seconds)
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        try:
+            await self._pause(keys=[self.key], args=[int(seconds * 1000)])
+        except Exception as e:
+            logger.warning(f"Pauzu zdieľaného rozpočtu {self.key} sa nepodarilo uložiť: {str(e)}")
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Exponenciálny backoff s "full jitter": náhodne z intervalu [0, min(cap, base * 2^attempt)]
+    """
+    return random.uniform(0, min(cap, base * 2 ** min(attempt, 32)))
@@ -1,38 +1,370 @@
 from redis import Redis
+from redis import asyncio as aioredis
 from config import settings
-import json
+from database import AsyncSessionLocal
+from local_cache import LocalCache, MISSING
+from singleflight import AsyncSingleFlight
+from serialization import dumps, loads
+from metrics import CACHE_REQUESTS
+from collections import Counter
+import asyncio
+import logging
+import time
+import uuid
 
-# Cache konštanty
-CACHE_TTL = 300  # 5 minút
-COIN_CACHE_KEY = "coin:{}"
-MARKET_DATA_CACHE_KEY = "market_data:{}"
-TOP_COINS_CACHE_KEY = "top_coins:{}"
+logger = logging.getLogger(__name__)
 
+# Rodiny cache kľúčov a ich TTL v sekundách. Kľúč v Redis má tvar
+# "{rodina}:v{generácia}:{kľúč}", invalidácia celej rodiny je jeden INCR
+# generácie (bez KEYS/SCAN), staré záznamy vypršia podľa TTL. Hodnota je
+# "{soft expirácia}|{JSON}", kde JSON sú už vyrenderované bajty odpovede.
+CACHE_TTLS = {
+    "coin": 300,  # Detail kryptomeny
+    "coins": 60,  # Stránky zoznamu kryptomien bez cien
+    "coins_prices": 60,  # Stránky zoznamu s cenami alebo zoradené podľa market_cap
+    "count": 60,  # Celkový počet kryptomien
+    "price": 60,  # Cena jednej kryptomeny
+    "prices": 60,  # Ceny pre zoznam kryptomien
+    "top": 60,  # Rebríčky /market/top
+    "fx": 300,  # Výmenné kurzy voči USD
+    "analytics": 300  # Metriky /analytics
+}
+CACHE_GENERATION_KEY = "cache:gen:{}"
+# Kanál, cez ktorý zapisovatelia oznamujú invalidáciu rodín ostatným workerom
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Kanál, na ktorý background updater publikuje zmenené ceny pre streaming
+PRICE_UPDATES_CHANNEL = "prices:updates"
+# Posledné zapísané hodnoty cien (hash coin_id -> JSON) pre detekciu zmien
+PRICE_SNAPSHOT_KEY = "prices:snapshot"
+
+# Priebeh úloh hromadného pridania kryptomien (hash) a ako dlho sa uchováva
+ONBOARDING_JOB_KEY = "job:onboarding:{}"
+ONBOARDING_JOB_TTL = 86400
+
+# Zdieľaný rozpočet požiadaviek na CoinGecko (hash s tokenmi a časom poslednej zmeny)
+COINGECKO_RATE_LIMIT_KEY = "ratelimit:coingecko"
+
+# Rebríčky kryptomien (Redis sorted sets) udržiavané pri aktualizácii cien
+MARKET_RANK_KEY = "market:rank:{}"
+MARKET_RANK_FIELDS = {
+    "market_cap": "usd_market_cap",
+    "volume": "usd_24h_vol",
+    "change": "usd_24h_change"
+}
+
+# Synchrónny klient pre skripty mimo event loopu
 redis_client = Redis(
     host=settings.REDIS_HOST,
     port=settings.REDIS_PORT,
     decode_responses=True
 )
 
+# Asynchrónny klient pre endpointy, cache a ingestion
+async_redis_client = aioredis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    decode_responses=True
+)
+
+# Klient bez dekódovania odpovedí pre hodnoty cache (JSON bajty sa vracajú bez kópie do str)
+_cache_redis = aioredis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    decode_responses=False
+)
+
+# Prečíta generáciu rodiny a hodnotu pod ňou jedným round tripom
+_LOOKUP_SCRIPT = """
+local generation = redis.call('GET', KEYS[1]) or '0'
+local value = redis.call('GET', ARGV[1] .. ':v' .. generation .. ':' .. ARGV[2])
+if value then
+    return {generation, value}
+end
+return {generation}
+"""
+_lookup = _cache_redis.register_script(_LOOKUP_SCRIPT)
+
+# Uvoľní zámok iba ak ho stále drží ten, kto ho získal
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+_release_lock = async_redis_client.register_script(_RELEASE_LOCK_SCRIPT)
+
+# Zlučovanie súbežných výpočtov toho istého kľúča v rámci procesu
+_flights = AsyncSingleFlight()
+
+# Prebiehajúce obnovy zastaraných (stale-while-revalidate) záznamov na pozadí
+_revalidating = {}
+
+# In-process L1 cache pred Redis, koherentná cez pub/sub invalidácie
+l1_cache = LocalCache(settings.L1_CACHE_SIZE, settings.L1_CACHE_TTL)
+
+# Počítadlá zásahov a výpadkov cache pre každú rodinu (v rámci procesu)
+cache_stats = Counter()
+
+def _record(family: str, result: str):
+    cache_stats[f"{family}:{result}"] += 1
+    CACHE_REQUESTS.labels(family, result).inc()
+
 def get_redis():
     return redis_client
 
-def get_cached_data(key: str):
-    data = redis_client.get(key)
-    if data:
-        return json.loads(data)
-    return None
-
-def set_cached_data(key: str, data, ttl: int = CACHE_TTL):
-    if hasattr(data, '__json__'):
-        serialized_data = data.__json__()
-    elif isinstance(data, list):
-        serialized_data = [item.__json__() if hasattr(item, '__json__') else item for item in data]
-    else:
-        serialized_data = data
-    redis_client.setex(key, ttl, json.dumps(serialized_data))
-
-def invalidate_cache(pattern: str):
-    keys = redis_client.keys(pattern)
+async def close_clients():
+    """
+    Uzavrie všetky Redis klienty (pri vypnutí procesu)
+    """
+    await async_redis_client.aclose()
+    await _cache_redis.aclose()
+    redis_client.close()
+
+def _data_key(family: str, generation: str, key: str) -> str:
+    return f"{family}:v{generation}:{key}"
+
+def _decode_entry(value: bytes):
+    """
+    Rozdelí hodnotu z Redis na (soft expirácia, JSON bajty), neplatný formát je výpadok
+    """
+    expires_at, separator, body = value.partition(b"|")
+    try:
+        return (float(expires_at), body) if separator else None
+    except ValueError:
+        return None
+
+async def _read(family: str, key: str):
+    """
+    Vráti (generácia, záznam) z Redis, záznam má tvar (soft expirácia, JSON bajty)
+    """
+    result = await _lookup(keys=[CACHE_GENERATION_KEY.format(family)], args=[family, key])
+    entry = _decode_entry(result[1]) if len(result) > 1 else None
+    return result[0].decode(), entry
+
+async def _store(family: str, key: str, generation: str, body: bytes, ttl: int, epoch: int):
+    """
+    Uloží JSON bajty do Redis (s oknom pre stale-while-revalidate) aj do L1
+    """
+    try:
+        await _cache_redis.setex(
+            _data_key(family, generation, key),
+            ttl + settings.CACHE_STALE_TTL,
+            b"%.3f|%s" % (time.time() + ttl, body)
+        )
+        l1_cache.set(family, key, body, ttl, epoch)
+    except Exception as e:
+        logger.warning(f"Chyba pri ukladaní do cache: {str(e)}")
+
+async def _load_and_store(family: str, key: str, generation, loader, db, ttl: int, epoch: int, wait_for_lock: bool = True):
+    """
+    Vypočíta hodnotu cez await loader(db), vyrenderuje ju do JSON a uloží
+
+    Ak je zapnutý CACHE_DISTRIBUTED_LOCK, výpočet chráni krátky Redis
+    zámok, takže naprieč procesmi počíta iba jeden. Ostatní čakajú na
+    jeho výsledok v cache, najviac CACHE_LOCK_TIMEOUT sekúnd.
+    """
+    lock_key = None
+    token = uuid.uuid4().hex
+    if generation is not None and settings.CACHE_DISTRIBUTED_LOCK:
+        lock_key = f"lock:{_data_key(family, generation, key)}"
+        try:
+            if not await async_redis_client.set(lock_key, token, nx=True, px=int(settings.CACHE_LOCK_TIMEOUT * 1000)):
+                if not wait_for_lock:
+                    return None
+                deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(0.05)
+                    current_generation, entry = await _read(family, key)
+                    if entry is not None and entry[0] > time.time():
+                        _record(family, "hit")
+                        l1_cache.set(family, key, entry[1], ttl, epoch)
+                        return entry[1]
+                    if current_generation != generation:
+                        break
+                # Zámok vypršal bez výsledku, vypočítame hodnotu sami
+                lock_key = None
+        except Exception as e:
+            logger.warning(f"Chyba pri získavaní zámku cache: {str(e)}")
+            lock_key = None
+
+    try:
+        body = dumps(await loader(db))
+        if generation is not None:
+            await _store(family, key, generation, body, ttl, epoch)
+        return body
+    finally:
+        if lock_key is not None:
+            try:
+                await _release_lock(keys=[lock_key], args=[token])
+            except Exception as e:
+                logger.warning(f"Chyba pri uvoľňovaní zámku cache: {str(e)}")
+
+def _revalidate(family: str, key: str, generation: str, loader, ttl: int):
+    """
+    Na pozadí obnoví zastaraný záznam, najviac jedna obnova na kľúč
+    """
+    flight_key = f"{family}:{key}"
+    if flight_key in _revalidating:
+        return
+
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                epoch = l1_cache.epoch(family)
+                await _flights.do(flight_key, lambda: _load_and_store(
+                    family, key, generation, loader, db, ttl, epoch, wait_for_lock=False
+                ))
+        except Exception as e:
+            logger.error(f"Chyba pri obnove cache {flight_key}: {str(e)}")
+        finally:
+            _revalidating.pop(flight_key, None)
+
+    # Referenciu na task držíme, kým nedobehne (inak by ho mohol zmazať GC)
+    _revalidating[flight_key] = asyncio.create_task(run())
+
+async def cached(family: str, key: str, loader, db, ttl: int = None):
+    """
+    Ako cached_json, ale vráti rozparsované dáta (pre ďalšie spracovanie)
+    """
+    return loads(await cached_json(family, key, loader, db, ttl))
+
+async def cached_json(family: str, key: str, loader, db, ttl: int = None) -> bytes:
+    """
+    Vráti JSON bajty z cache alebo hodnotu vypočíta cez await loader(db),
+    vyrenderuje a uloží
+
+    Bajty sa dajú vrátiť klientovi priamo (serialization.json_response),
+    bez opätovného parsovania a validácie.
+
+    Poradie: L1 cache, Redis, výpočet. Generácia sa zistí pred volaním
+    loader(), takže ak medzitým prebehne invalidácia, výsledok sa uloží
+    pod už neplatnú generáciu a nikto ho neprečíta. Súbežné výpadky toho
+    istého kľúča sa zlúčia do jedného výpočtu. Záznam po uplynutí TTL
+    ešte CACHE_STALE_TTL sekúnd slúži ako zastaraný, kým sa na pozadí
+    obnovuje (s vlastnou DB session).
+    """
+    if family not in CACHE_TTLS:
+        raise ValueError(f"Neznáma rodina cache: {family}")
+
+    # Epochu L1 zistíme pred čítaním, aby sme neuložili dáta staršie ako invalidácia
+    epoch = l1_cache.epoch(family)
+    value = l1_cache.get(family, key)
+    if value is not MISSING:
+        _record(family, "l1_hit")
+        return value
+
+    ttl = ttl or CACHE_TTLS[family]
+    generation = None
+    try:
+        generation, entry = await _read(family, key)
+        if entry is not None:
+            remaining = entry[0] - time.time()
+            if remaining > 0:
+                _record(family, "hit")
+                l1_cache.set(family, key, entry[1], remaining, epoch)
+            else:
+                _record(family, "stale_hit")
+                _revalidate(family, key, generation, loader, ttl)
+            return entry[1]
+    except Exception as e:
+        logger.warning(f"Chyba pri čítaní z cache: {str(e)}")
+
+    _record(family, "miss")
+    return await _flights.do(
+        f"{family}:{key}",
+        lambda: _load_and_store(family, key, generation, loader, db, ttl, epoch)
+    )
+
+async def cache_delete(family: str, *keys: str):
+    """
+    Zmaže konkrétne kľúče v aktuálnej generácii rodiny
+
+    L1 cache ostatných workerov nevie mazať jednotlivé kľúče, zahodí
+    preto celú rodinu (dáta sa znova načítajú z Redis).
+    """
+    generation = await async_redis_client.get(CACHE_GENERATION_KEY.format(family)) or "0"
+    pipe = async_redis_client.pipeline(transaction=False)
     if keys:
-        redis_client.delete(*keys) 
\ No newline at end of file
+        pipe.delete(*[_data_key(family, generation, key) for key in keys])
+    pipe.publish(CACHE_INVALIDATION_CHANNEL, family)
+    await pipe.execute()
+    l1_cache.invalidate(family)
+
+async def invalidate_cache(*families: str):
+    """
+    Zneplatní celé rodiny cache zvýšením ich generácie (O(1) na rodinu)
+    a oznámi invalidáciu L1 cache všetkých workerov
+    """
+    pipe = async_redis_client.pipeline(transaction=False)
+    for family in families:
+        pipe.incr(CACHE_GENERATION_KEY.format(family))
+        pipe.publish(CACHE_INVALIDATION_CHANNEL, family)
+    await pipe.execute()
+    for family in families:
+        l1_cache.invalidate(family)
+
+async def _listen_for_invalidations():
+    """
+    Počúva na kanáli invalidácií a zahadzuje rodiny z L1 cache
+
+    Po výpadku spojenia sa L1 cache vyprázdni celá, keďže počas výpadku
+    mohli byť správy stratené.
+    """
+    while True:
+        pubsub = async_redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            l1_cache.clear()
+            while True:
+                message = await pubsub.get_message(timeout=None)
+                if message is not None and message["type"] == "message":
+                    l1_cache.invalidate(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Chyba v listeneri invalidácií cache: {str(e)}")
+            l1_cache.clear()
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+_listener_task = None
+
+def start_invalidation_listener():
+    """
+    Spustí listener invalidácií L1 cache (raz na proces)
+    """
+    global _listener_task
+    if _listener_task is None:
+        _listener_task = asyncio.create_task(_listen_for_invalidations())
+
+async def stop_invalidation_listener():
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+
+def get_cache_stats() -> dict:
+    """
+    Počty zásahov (L1, Redis, zastarané), výpadkov a hit ratio pre každú rodinu cache
+    """
+    stats = {"l1_size": len(l1_cache)}
+    for family in CACHE_TTLS:
+        l1_hits = cache_stats[f"{family}:l1_hit"]
+        hits = cache_stats[f"{family}:hit"]
+        stale_hits = cache_stats[f"{family}:stale_hit"]
+        misses = cache_stats[f"{family}:miss"]
+        total = l1_hits + hits + stale_hits + misses
+        stats[family] = {
+            "l1_hits": l1_hits,
+            "hits": hits,
+            "stale_hits": stale_hits,
+            "misses": misses,
+            "hit_ratio": (l1_hits + hits + stale_hits) / total if total else None
+        }
+    return stats
\ No newline at end of file
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Date, Text, UUID, JSON
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Date, Text, UUID, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
 import uuid
@@ -11,16 +13,20 @@ class Coin(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     symbol = Column(String(10), nullable=False)
     name = Column(String(100), nullable=False)
-    coin_metadata = Column(JSON, nullable=True)  # Pre uloženie dodatočných informácií z CoinGecko
 
+    price = relationship("CoinPrice", uselist=False, back_populates="coin", passive_deletes=True)
+    # Dodatočné informácie z CoinGecko sú v samostatnej tabuľke, načítavajú sa iba na požiadanie
+    metadata_entry = relationship("CoinMetadata", uselist=False, back_populates="coin", passive_deletes=True)
+
+    # Bez metadát: lazy načítanie metadata_entry pod AsyncSession zlyhá (MissingGreenlet),
+    # metadáta serializuje crud._coin_to_dict po selectinload
     def __json__(self):
         return {
             "coin_id": self.coin_id,
             "symbol": self.symbol,
             "name": self.name,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "metadata": self.coin_metadata if self.coin_metadata else None
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
         }
 
     def to_dict(self):
@@ -29,10 +35,32 @@ class Coin(Base):
             "symbol": self.symbol,
             "name": self.name,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "metadata": self.coin_metadata if self.coin_metadata else None
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
         }
 
+class CoinMetadata(Base):
+    """
+    Metadáta kryptomeny (popis, odkazy, platformy) oddelené od riadku coins
+
+    Riadok coins tak zostáva malý pre zoznamy a joiny s cenami. content_hash
+    (SHA-256 kanonického JSON) slúži na preskočenie zápisu nezmenených
+    metadát pri obnove a ako ETag pre podmienené požiadavky.
+    """
+    __tablename__ = "coin_metadata"
+
+    coin_id = Column(String(100), ForeignKey("coins.coin_id", ondelete="CASCADE"), primary_key=True, nullable=False)
+    data = Column(JSONB, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())  # Posledná zmena obsahu
+    checked_at = Column(DateTime(timezone=True), server_default=func.now())  # Posledné stiahnutie z CoinGecko (NULL = čaká na obnovu)
+
+    coin = relationship("Coin", back_populates="metadata_entry")
+
+    __table_args__ = (
+        # Index pre výber metadát splatných na obnovu
+        Index("ix_coin_metadata_checked_at", checked_at.asc().nulls_first()),
+    )
+
 class CoinPrice(Base):
     __tablename__ = "coin_prices"
 
@@ -45,12 +73,93 @@ class CoinPrice(Base):
     usd_24h_change = Column(Numeric(10, 2))
     last_updated_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    coin = relationship("Coin", back_populates="price")
+
+    __table_args__ = (
+        # Index pre keyset stránkovanie zoradené podľa trhovej kapitalizácie
+        Index("ix_coin_prices_market_cap_coin_id", usd_market_cap.desc().nulls_last(), coin_id),
+    )
+
     def to_dict(self):
         return {
             "coin_id": self.coin_id,
-            "usd": float(self.usd) if self.usd else None,
-            "usd_market_cap": float(self.usd_market_cap) if self.usd_market_cap else None,
-            "usd_24h_vol": float(self.usd_24h_vol) if self.usd_24h_vol else None,
-            "usd_24h_change": float(self.usd_24h_change) if self.usd_24h_change else None,
+            "usd": float(self.usd) if self.usd is not None else None,
+            "usd_market_cap": float(self.usd_market_cap) if self.usd_market_cap is not None else None,
+            "usd_24h_vol": float(self.usd_24h_vol) if self.usd_24h_vol is not None else None,
+            "usd_24h_change": float(self.usd_24h_change) if self.usd_24h_change is not None else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
             "last_updated_at": self.last_updated_at.isoformat() if self.last_updated_at else None
-        } 
\ No newline at end of file
+        }
+
+class FxRate(Base):
+    """
+    Výmenné kurzy voči USD, obnovované z CoinGecko /exchange_rates na pozadí
+
+    Ceny sa ukladajú iba v USD, ostatné meny sa z nich prepočítajú
+    v pamäti pri čítaní bez ďalších požiadaviek na CoinGecko.
+    """
+    __tablename__ = "fx_rates"
+
+    currency = Column(String(10), primary_key=True, nullable=False)  # Kód meny malými písmenami (eur, gbp, btc)
+    name = Column(String(100), nullable=False)
+    unit = Column(String(10))
+    type = Column(String(20))  # fiat, crypto alebo commodity
+    rate = Column(Numeric(38, 18), nullable=False)  # Počet jednotiek meny za 1 USD
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class CoinPriceTick(Base):
+    """
+    Append-only história cien zapisovaná periodickou aktualizáciou
+
+    Tabuľka je v PostgreSQL rozdelená po mesiacoch podľa ts (partície
+    vytvára ingestion.ensure_tick_partitions), primárny kľúč (coin_id, ts)
+    slúži ako index pre rozsahové dopyty jednej kryptomeny.
+    """
+    __tablename__ = "coin_price_ticks"
+
+    coin_id = Column(String(100), primary_key=True, nullable=False)
+    ts = Column(DateTime(timezone=True), primary_key=True, nullable=False)  # last_updated_at z CoinGecko
+    usd = Column(Numeric(24, 8), nullable=False)
+    usd_market_cap = Column(Numeric(30, 2))
+    usd_24h_vol = Column(Numeric(30, 2))
+    usd_24h_change = Column(Numeric(10, 2))
+
+    __table_args__ = {"postgresql_partition_by": "RANGE (ts)"}
+
+    def to_dict(self):
+        return {
+            "ts": self.ts.isoformat() if self.ts else None,
+            "usd": float(self.usd) if self.usd is not None else None,
+            "usd_market_cap": float(self.usd_market_cap) if self.usd_market_cap is not None else None,
+            "usd_24h_vol": float(self.usd_24h_vol) if self.usd_24h_vol is not None else None,
+            "usd_24h_change": float(self.usd_24h_change) if self.usd_24h_change is not None else None
+        }
+
+# Rozlíšenia OHLCV rollupov (v sekundách), ktoré udržiava ingestion
+OHLC_RESOLUTIONS = {
+    "1m": 60,
+    "5m": 300,
+    "1h": 3600,
+    "1d": 86400
+}
+
+class CoinPriceOHLC(Base):
+    """
+    Predpočítané OHLCV sviečky, inkrementálne aktualizované pri každom novom ticku
+
+    CoinGecko poskytuje iba kĺzavý 24h objem, volume je preto posledná
+    hodnota usd_24h_vol v danom okne.
+    """
+    __tablename__ = "coin_price_ohlc"
+
+    coin_id = Column(String(100), primary_key=True, nullable=False)
+    resolution = Column(String(3), primary_key=True, nullable=False)  # Kľúč z OHLC_RESOLUTIONS
+    bucket = Column(DateTime(timezone=True), primary_key=True, nullable=False)  # Začiatok okna
+    open = Column(Numeric(24, 8), nullable=False)
+    high = Column(Numeric(24, 8), nullable=False)
+    low = Column(Numeric(24, 8), nullable=False)
+    close = Column(Numeric(24, 8), nullable=False)
+    volume = Column(Numeric(30, 2))
+    open_ts = Column(DateTime(timezone=True), nullable=False)  # Čas ticku, z ktorého je open
+    close_ts = Column(DateTime(timezone=True), nullable=False)  # Čas ticku, z ktorého je close
\ No newline at end of file
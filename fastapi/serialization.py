@@ -0,0 +1,36 @@
+from fastapi.responses import Response
+from decimal import Decimal
+import hashlib
+import orjson
+
+def _default(obj):
+    # orjson nepozná Decimal (Numeric stĺpce), ostatné typy (datetime, UUID) zvláda sám
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Typ {type(obj).__name__} sa nedá serializovať do JSON")
+
+def dumps(data) -> bytes:
+    """
+    Serializuje dáta do JSON bajtov cez orjson
+    """
+    return orjson.dumps(data, default=_default)
+
+def content_hash(data) -> str:
+    """
+    SHA-256 kanonického JSON (zoradené kľúče), rovnaké dáta majú vždy rovnaký hash
+    """
+    return hashlib.sha256(orjson.dumps(data, default=_default, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+def loads(body: bytes):
+    return orjson.loads(body)
+
+def json_response(body, status_code: int = 200, headers: dict = None) -> Response:
+    """
+    JSON odpoveď bez validácie cez response_model
+
+    body sú buď už vyrenderované bajty (napr. z cache), alebo dáta,
+    ktoré sa serializujú cez orjson.
+    """
+    if not isinstance(body, bytes):
+        body = dumps(body)
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
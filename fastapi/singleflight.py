@@ -0,0 +1,48 @@
+import asyncio
+
+class _LeaderCancelled(Exception):
+    """
+    Vykonávajúce volanie bolo zrušené, čakajúci si výpočet prevezmú
+    """
+
+class AsyncSingleFlight:
+    """
+    Zlúčenie súbežných výpočtov toho istého kľúča (pre asyncio)
+
+    Prvé volanie pre daný kľúč vykoná coro_fn(), ostatné súbežné volania
+    počkajú na jeho výsledok (alebo výnimku) namiesto vlastného výpočtu.
+    Ak je prvé volanie zrušené (napr. klient sa odpojil), čakajúci nedostanú
+    CancelledError, ale jeden z nich spustí vlastný coro_fn() (so svojimi
+    zdrojmi, napr. DB session) a ostatní čakajú naň.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key: str, coro_fn):
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                break
+            try:
+                # shield: zrušenie čakajúceho nesmie zrušiť výpočet pre ostatných
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        # Výnimku označíme ako spracovanú aj keď na výsledok nikto nečaká
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await coro_fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._calls[key]
@@ -0,0 +1,122 @@
+from redis_client import async_redis_client, PRICE_UPDATES_CHANNEL
+from serialization import loads
+from config import settings
+from typing import Optional, Set
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+def parse_subscription_message(message) -> Optional[Set[str]]:
+    """
+    Overí správu klienta {"coin_ids": [...]} a vráti nový odber (None = všetky kryptomeny)
+
+    Neplatná správa vyhodí ValueError, klient dostane chybovú správu
+    a spojenie zostane otvorené.
+    """
+    if not isinstance(message, dict) or "coin_ids" not in message:
+        raise ValueError("Správa musí byť objekt s poľom coin_ids")
+    coin_ids = message["coin_ids"]
+    if not coin_ids:
+        return None
+    if not isinstance(coin_ids, list) or not all(isinstance(coin_id, str) for coin_id in coin_ids):
+        raise ValueError("Pole coin_ids musí byť zoznam reťazcov")
+    if len(coin_ids) > settings.STREAM_MAX_COIN_IDS:
+        raise ValueError(f"Odber môže obsahovať najviac {settings.STREAM_MAX_COIN_IDS} kryptomien")
+    return {coin_id.strip() for coin_id in coin_ids if coin_id.strip()} or None
+
+class PriceSubscription:
+    """
+    Odber cien jedného klienta (WebSocket alebo SSE spojenie)
+
+    Čakajúce zmeny sa zlučujú podľa coin_id, pomalý klient tak dostane
+    iba najnovšiu cenu každej kryptomeny a pamäť je ohraničená počtom
+    odoberaných kryptomien. Broadcaster nikdy nečaká na klienta.
+    """
+
+    def __init__(self, coin_ids: Optional[Set[str]] = None):
+        self.coin_ids = coin_ids  # None = všetky kryptomeny
+        self._pending = {}
+        self._event = asyncio.Event()
+
+    def push(self, updates: list):
+        for update in updates:
+            if self.coin_ids is None or update["coin_id"] in self.coin_ids:
+                self._pending[update["coin_id"]] = update
+        if self._pending:
+            self._event.set()
+
+    async def get(self, timeout: float = None) -> list:
+        """
+        Počká na zmeny a vráti ich (prázdny zoznam ak vypršal timeout)
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._event.clear()
+        updates = list(self._pending.values())
+        self._pending = {}
+        return updates
+
+class PriceBroadcaster:
+    """
+    Rozosiela zmeny cien z Redis pub/sub všetkým klientom tohto workera
+
+    Každý API worker má jedno odberateľské spojenie na PRICE_UPDATES_CHANNEL
+    bez ohľadu na počet pripojených klientov.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._task = None
+
+    def subscribe(self, coin_ids: Optional[Set[str]] = None) -> PriceSubscription:
+        subscription = PriceSubscription(coin_ids)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: PriceSubscription):
+        self._subscriptions.discard(subscription)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    async def _listen(self):
+        while True:
+            pubsub = async_redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(PRICE_UPDATES_CHANNEL)
+                while True:
+                    message = await pubsub.get_message(timeout=None)
+                    if message is None or message["type"] != "message":
+                        continue
+                    updates = loads(message["data"])
+                    for subscription in list(self._subscriptions):
+                        subscription.push(updates)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Chyba v odbere zmien cien: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def start(self):
+        """
+        Spustí odber zmien cien (raz na worker)
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+            logger.info("Odber zmien cien pre streaming bol spustený")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+broadcaster = PriceBroadcaster()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Moduly aplikácie sú ploché v priečinku fastapi/ (import singleflight, ratelimit, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+from ratelimit import SharedTokenBucket, TokenBucket
+import asyncio
+
+class _FailingRedis:
+    """
+    Redis klient, ktorého skripty zlyhajú (Redis nie je dostupný)
+    """
+
+    def register_script(self, script):
+        async def run(keys, args):
+            raise ConnectionError("Redis nie je dostupný")
+        return run
+
+class _ScriptedRedis:
+    """
+    Redis klient, ktorého skript acquire vracia pripravené odpovede
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+
+    def register_script(self, script):
+        async def run(keys, args):
+            return self.replies.pop(0)
+        return run
+
+def test_shared_bucket_falls_back_to_local_bucket():
+    async def scenario():
+        bucket = SharedTokenBucket(_FailingRedis(), "test:ratelimit", 1.0, 2)
+        await bucket.acquire()
+        await bucket.acquire()
+        return bucket.local.available()
+
+    assert asyncio.run(scenario()) < 1
+
+def test_shared_bucket_waits_for_shared_budget():
+    async def scenario():
+        bucket = SharedTokenBucket(_ScriptedRedis([[20, "0", 0], [0, "0.5", 0]]), "test:ratelimit", 1.0, 5)
+        await bucket.acquire()
+        return bucket.available()
+
+    assert 0.5 <= asyncio.run(scenario()) < 1
+
+def test_shared_bucket_reports_no_tokens_while_paused():
+    async def scenario():
+        bucket = SharedTokenBucket(_FailingRedis(), "test:ratelimit", 100.0, 5)
+        await bucket.pause(60)
+        return bucket.available()
+
+    assert asyncio.run(scenario()) == 0.0
+
+def test_available_does_not_change_bucket_state():
+    bucket = TokenBucket(1.0, 5)
+    state = (bucket._tokens, bucket._updated, bucket._paused_until)
+    bucket.available()
+    assert (bucket._tokens, bucket._updated, bucket._paused_until) == state
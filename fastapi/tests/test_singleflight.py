@@ -0,0 +1,83 @@
+from singleflight import AsyncSingleFlight
+import asyncio
+import pytest
+
+def test_waiters_share_leader_result():
+    async def scenario():
+        flights = AsyncSingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flights.do("key", compute) for _ in range(5)))
+        return results, calls
+
+    results, calls = asyncio.run(scenario())
+    assert results == [1] * 5
+    assert calls == 1
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    async def scenario():
+        flights = AsyncSingleFlight()
+        started = asyncio.Event()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            started.set()
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        leader = asyncio.create_task(flights.do("key", compute))
+        await started.wait()
+        waiters = [asyncio.create_task(flights.do("key", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters), calls
+
+    results, calls = asyncio.run(scenario())
+    assert results == ["ok"] * 3
+    # Výpočet prevzal jeden z čakajúcich
+    assert calls == 2
+
+def test_cancelled_waiter_does_not_cancel_leader():
+    async def scenario():
+        flights = AsyncSingleFlight()
+        started = asyncio.Event()
+
+        async def compute():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        leader = asyncio.create_task(flights.do("key", compute))
+        await started.wait()
+        waiter = asyncio.create_task(flights.do("key", compute))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(scenario()) == "ok"
+
+def test_leader_exception_is_shared():
+    async def scenario():
+        flights = AsyncSingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("chyba")
+
+        return await asyncio.gather(*(flights.do("key", compute) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
@@ -0,0 +1,50 @@
+"""
+Samostatný proces pre aktualizáciu cien (oddelený od API)
+
+Spustenie: python worker.py
+
+Môže bežať vo viacerých replikách, ceny aktualizuje vždy iba vodca
+(zámok v Redis), ostatné repliky čakajú ako záloha. API procesy potom
+bežia s RUN_INGESTION_IN_API=false.
+"""
+import schemas
+import coingecko
+import ingestion
+from database import engine, async_engine
+from redis_client import close_clients
+from background_tasks import start_price_updates, stop_price_updates
+from config import settings
+from prometheus_client import start_http_server
+import asyncio
+import signal
+import logging
+
+# Nastavenie logovania
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    if settings.WORKER_METRICS_PORT:
+        # Metriky aktualizácie cien a CoinGecko (worker nemá vlastné API)
+        start_http_server(settings.WORKER_METRICS_PORT)
+    start_price_updates()
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Worker sa ukončuje, uvoľňuje vodcovstvo")
+        await stop_price_updates()
+        await coingecko.close_client()
+        await async_engine.dispose()
+        await close_clients()
+
+if __name__ == "__main__":
+    # Vytvorenie tabuliek (ak worker štartuje pred API)
+    schemas.Base.metadata.create_all(bind=engine)
+    ingestion.migrate_legacy_metadata(engine)
+    ingestion.ensure_indexes(engine)
+    asyncio.run(main())